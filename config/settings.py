@@ -3,22 +3,31 @@ Configuration centralisée du projet
 """
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 
-# Charger le fichier .env depuis le répertoire racine du projet
+# Parser le fichier .env UNE SEULE FOIS en un dict figé (pas de mutation
+# de os.environ, pas de re-parsing à chaque import dans les workers)
 env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+_env = {**dotenv_values(dotenv_path=env_path), **os.environ}
 
 class Settings:
     """Configuration de l'application"""
-    
+
     # Apify
-    APIFY_API_TOKEN = os.getenv('APIFY_API_TOKEN')
-    APIFY_ACTOR_NAME = os.getenv('APIFY_ACTOR_NAME', 'apify/meta-ad-library-scraper')
-    APIFY_ACTOR_ID = os.getenv('APIFY_ACTOR_ID')
+    APIFY_API_TOKEN = _env.get('APIFY_API_TOKEN')
+    APIFY_ACTOR_NAME = _env.get('APIFY_ACTOR_NAME', 'apify/meta-ad-library-scraper')
+    APIFY_ACTOR_ID = _env.get('APIFY_ACTOR_ID')
+    # QPS autorisé vers Apify (token bucket partagé entre les workers)
+    APIFY_RATE_PER_SEC = float(_env.get('APIFY_RATE_PER_SEC', '2'))
 
     # Search
-    DEFAULT_COUNTRY = os.getenv('DEFAULT_COUNTRY', 'TN')
+    DEFAULT_COUNTRY = _env.get('DEFAULT_COUNTRY', 'TN')
+
+    # MongoDB
+    MONGODB_URI = _env.get(
+        'MONGODB_URI',
+        'mongodb://127.0.0.1:27017/?directConnection=true'
+    )
     
     # Paths
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -2,6 +2,9 @@
 Dashboard Streamlit - Converty Analytics
 Application interactive pour le suivi des clients et concurrents
 """
+import io
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
@@ -17,42 +20,595 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS personnalisé
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #10b981;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 10px;
-        color: white;
-        text-align: center;
-    }
-    .status-active {
-        color: #22c55e;
-        font-weight: bold;
+# CSS personnalisé (fichier externe lu une seule fois puis caché,
+# au lieu de re-parser le gros bloc markdown à chaque rerun)
+@st.cache_data
+def _css() -> str:
+    return (Path(__file__).parent / 'assets' / 'styles.css').read_text(encoding='utf-8')
+
+
+st.markdown(f"<style>{_css()}</style>", unsafe_allow_html=True)
+
+
+@st.cache_resource
+def get_loader():
+    """DataLoader partagé entre toutes les sessions (pool de connexions MongoDB)
+
+    Évite un handshake TCP + auth MongoDB à chaque refresh: la connexion
+    est ouverte une fois et gérée par le pool de pymongo.
+    """
+    return DataLoader()
+
+
+@st.cache_data(ttl=600)
+def load_stores(refresh_key: int):
+    """Charger les stores (volatilité faible → TTL long)
+
+    Projection minimale: le dashboard n'utilise que slug/domain, inutile
+    de décoder 21k documents complets.
+    """
+    return get_loader().get_all_stores(projection={'slug': 1, 'domain': 1, '_id': 0})
+
+
+@st.cache_resource
+def _doc_cache():
+    """Cache incrémental partagé des documents ads_metrics (clé: _id)
+
+    Persiste entre les reruns: chaque refresh ne récupère que les
+    documents dont le timestamp dépasse le dernier vu (O(docs modifiés)).
+    """
+    return {'docs': {}, 'last_ts': None}
+
+
+def _refresh_doc_cache():
+    """Fusionner les documents modifiés depuis le dernier refresh"""
+    cache = _doc_cache()
+    docs, last_ts = get_loader().load_incremental(cache['last_ts'])
+    for doc in docs:
+        cache['docs'][doc['_id']] = doc
+    cache['last_ts'] = last_ts
+    return cache
+
+
+@st.cache_data(ttl=300)
+def load_mappings(refresh_key: int):
+    """Charger les mappings Phase 1 (TTL intermédiaire)"""
+    docs = _refresh_doc_cache()['docs']
+    return [d for d in docs.values() if d.get('type') == 'mapping']
+
+
+@st.cache_data(ttl=60)
+def load_reports(refresh_key: int):
+    """Charger les rapports Phase 2 (données les plus volatiles → TTL court)"""
+    docs = _refresh_doc_cache()['docs']
+    return [d for d in docs.values() if d.get('type') == 'report']
+
+
+@st.cache_data(ttl=60)
+def load_latest_report(refresh_key: int):
+    """Charger le dernier rapport Phase 2 (find_one trié côté MongoDB)"""
+    return get_loader().get_latest_report()
+
+
+@st.cache_data(ttl=60)
+def load_latest_reports(refresh_key: int):
+    """Charger le dernier rapport de chaque client ($group côté MongoDB)"""
+    return get_loader().get_latest_reports()
+
+
+@st.cache_data(ttl=60)
+def load_kpi_aggregates(refresh_key: int):
+    """Charger les KPIs concurrents agrégés côté MongoDB ($facet)"""
+    return get_loader().get_kpi_aggregates()
+
+
+@st.cache_data(ttl=60)
+def load_client_history(client_id: str, refresh_key: int):
+    """Historique d'un client via requête indexée MongoDB (pas de scan local)"""
+    return get_loader().get_client_history(client_id)
+
+
+@st.cache_data(ttl=60)
+def search_clients(search_query: str, refresh_key: int):
+    """Recherche de client_ids côté MongoDB (sous-chaîne, filtrage serveur)"""
+    return get_loader().search_client_ids(search_query)
+
+
+@st.cache_data(max_entries=8)
+def to_csv_bytes(df_fingerprint: str, _df):
+    """Conversion DataFrame → CSV bytes, mémoïsée par combinaison de filtres
+
+    Évite de rematérialiser tout le CSV en mémoire à chaque rerun: la
+    conversion n'est recalculée que si le contenu filtré change.
+    max_entries borne la rétention (un CSV complet par combinaison de
+    filtres sinon conservé indéfiniment).
+    """
+    buf = io.BytesIO()
+    _df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+@st.cache_resource(max_entries=2)
+def get_calc(fingerprint: str, _data):
+    """MetricsCalculator partagé, reconstruit uniquement si les données changent
+
+    Le paramètre _data (préfixe underscore) n'est pas hashé par Streamlit:
+    la clé de cache est uniquement le fingerprint des données. max_entries
+    borne la rétention — chaque fingerprint retient un instantané complet
+    des données, sans borne le serveur always-on grossirait à chaque
+    refresh (le fingerprint change à chaque mise à jour des données).
+    """
+    return MetricsCalculator(_data)
+
+
+@st.cache_resource
+def get_charts():
+    """ChartGenerator sans état, partagé entre toutes les sessions"""
+    return ChartGenerator()
+
+
+# Figures Plotly mémoïsées par leurs entrées: un rerun avec des données
+# identiques réutilise la figure cachée au lieu de la reconstruire.
+# max_entries borne la rétention: chaque instantané de données distinct
+# produirait sinon une figure picklée conservée pour toujours
+@st.cache_data(max_entries=32)
+def cached_pie_chart(labels, values, title):
+    return get_charts().create_pie_chart(labels=labels, values=values, title=title)
+
+
+@st.cache_data(max_entries=32)
+def cached_bar_chart(labels, values, title, horizontal=False):
+    return get_charts().create_bar_chart(labels=labels, values=values,
+                                         title=title, horizontal=horizontal)
+
+
+@st.cache_data(max_entries=32)
+def cached_area_chart(dates, values, label):
+    return get_charts().create_area_chart(dates=dates, values=values, label=label)
+
+
+@st.cache_data(max_entries=32)
+def cached_time_series(dates, values_dict):
+    return get_charts().create_time_series(dates=dates, values_dict=values_dict)
+
+
+def load_all_data(refresh_key: int):
+    """Assembler les données par collection (caches indépendants par TTL)"""
+    # Les partitions actif/inactif ne sont plus pré-construites ici:
+    # MetricsCalculator les dérive paresseusement de 'mappings'
+    return {
+        'stores': load_stores(refresh_key),
+        'mappings': load_mappings(refresh_key),
+        'reports': load_reports(refresh_key),
+        'latest_report': load_latest_report(refresh_key),
+        'latest_reports': load_latest_reports(refresh_key),
+        'kpi_aggregates': load_kpi_aggregates(refresh_key),
+        'loaded_at': datetime.now()
     }
-    .status-inactive {
-        color: #6b7280;
-        font-weight: bold;
+
+
+@st.fragment(run_every="30s")
+def auto_refresh_tick():
+    """Auto-refresh non bloquant via fragment planifié
+
+    Remplace l'ancien time.sleep(30) + st.rerun() qui monopolisait le
+    worker Streamlit pendant 30s; ici le worker reste libre entre deux ticks.
+    """
+    elapsed = (datetime.now() - st.session_state.last_refresh).total_seconds()
+    if elapsed >= 30:
+        st.session_state.last_refresh = datetime.now()
+        st.session_state.refresh_key = (st.session_state.refresh_key + 1) % 8
+        st.rerun(scope="app")
+
+
+@st.fragment
+def render_overview(calc):
+    """Section Vue d'ensemble (fragment: rerun isolé du reste du script)"""
+    st.header("📊 Vue d'ensemble")
+
+    # KPIs principaux
+    overview_kpis = calc.get_overview_kpis()
+    ads_kpis = calc.get_ads_kpis()
+
+    # Progress bar globale
+    st.subheader("Progression du traitement")
+    st.progress(overview_kpis['progression'] / 100)
+    st.caption(f"**{overview_kpis['clients_traités']:,} / {overview_kpis['total_clients']:,} clients traités** ({overview_kpis['progression']:.1f}%)")
+
+    st.divider()
+
+    # Métriques en colonnes
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric(
+            label="📦 Total Clients",
+            value=f"{overview_kpis['total_clients']:,}",
+            delta=f"{overview_kpis['clients_restants']:,} restants"
+        )
+
+    with col2:
+        st.metric(
+            label="🟢 Clients Actifs",
+            value=f"{overview_kpis['actifs']:,}",
+            delta=f"{overview_kpis['ratio_actifs']:.1f}%"
+        )
+
+    with col3:
+        st.metric(
+            label="🔴 Clients Inactifs",
+            value=f"{overview_kpis['inactifs']:,}",
+            delta=f"{overview_kpis['ratio_inactifs']:.1f}%"
+        )
+
+    with col4:
+        st.metric(
+            label="📊 Total Publicités",
+            value=f"{ads_kpis['total_ads']:,}",
+            delta="Depuis Phase 1"
+        )
+
+    st.divider()
+
+    # Row 2
+    col5, col6, col7 = st.columns(3)
+
+    with col5:
+        if ads_kpis['has_phase2_data']:
+            st.metric(
+                label="✅ Publicités Converty",
+                value=f"{ads_kpis['converty_ads']:,}",
+                delta=f"{ads_kpis['ratio_converty']:.1f}%"
+            )
+        else:
+            st.info("ℹ️ Phase 2 non complétée - Pas de données de classification")
+
+    with col6:
+        if ads_kpis['has_phase2_data']:
+            st.metric(
+                label="⚠️ Publicités Concurrents",
+                value=f"{ads_kpis['competitor_ads']:,}",
+                delta=f"{100 - ads_kpis['ratio_converty']:.1f}%"
+            )
+
+    with col7:
+        st.metric(
+            label="📈 Ratio Converty",
+            value=f"{ads_kpis['ratio_converty']:.1f}%" if ads_kpis['has_phase2_data'] else "N/A",
+            delta="Objectif: >70%"
+        )
+
+    st.divider()
+
+    # Graphiques côte à côte
+    chart_col1, chart_col2 = st.columns(2)
+
+    with chart_col1:
+        st.subheader("Répartition Actifs/Inactifs")
+        pie_fig = cached_pie_chart(
+            labels=['Actifs', 'Inactifs'],
+            values=[overview_kpis['actifs'], overview_kpis['inactifs']],
+            title="Statut des clients traités"
+        )
+        st.plotly_chart(pie_fig, use_container_width=True)
+
+    with chart_col2:
+        st.subheader("Distribution Clients ACTIFS (Phase 2)")
+        dist_data_active = calc.get_activity_distribution()
+        bar_fig_active = cached_bar_chart(
+            labels=dist_data_active['bins'],
+            values=dist_data_active['counts'],
+            title=f"Clients Actifs: {sum(dist_data_active['counts'])} clients",
+            horizontal=False
+        )
+        st.plotly_chart(bar_fig_active, use_container_width=True)
+
+    # Deuxième ligne pour les inactifs
+    st.divider()
+    st.subheader("📊 Distribution Clients INACTIFS (Phase 1)")
+
+    col_inactive1, col_inactive2 = st.columns(2)
+
+    with col_inactive1:
+        dist_data_inactive = calc.get_activity_distribution_inactive()
+        bar_fig_inactive = cached_bar_chart(
+            labels=dist_data_inactive['bins'],
+            values=dist_data_inactive['counts'],
+            title=f"Clients Inactifs: {sum(dist_data_inactive['counts'])} clients",
+            horizontal=False
+        )
+        st.plotly_chart(bar_fig_inactive, use_container_width=True)
+
+    with col_inactive2:
+        st.info("""
+        **📌 Explication:**
+        - **Actifs (Phase 2)** : Clients avec des publicités détectées lors du dernier scan
+        - **Inactifs (Phase 1)** : Clients sans publicités lors de la Phase 1 initiale
+
+        ⚠️ Un client peut passer de "Actif" à "Inactif" entre deux runs si ses publicités sont supprimées
+        """)
+
+
+@st.fragment
+def render_temporal(calc, period_days):
+    """Section Analyse temporelle"""
+    st.header("📈 Analyse temporelle")
+
+    time_data = calc.get_time_series_data(days=period_days)
+    status_ts = calc.get_status_time_series(days=period_days)
+
+    if time_data['dates']:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.metric("📊 Période analysée", f"{len(time_data['dates'])} jours")
+        with col2:
+            st.metric("🆕 Total traité", sum(time_data['nouveaux_clients']))
+
+        st.divider()
+
+        st.subheader("Évolution du traitement")
+        area_fig = cached_area_chart(
+            dates=time_data['dates'],
+            values=time_data['cumul_clients'],
+            label="Clients traités (cumulé)"
+        )
+        st.plotly_chart(area_fig, use_container_width=True)
+
+        st.divider()
+
+        st.subheader("Nouveaux clients traités par jour")
+        line_fig = cached_time_series(
+            dates=time_data['dates'],
+            values_dict={
+                'Phase 1 (Discovery)': time_data['nouveaux_clients'],
+                'Phase 2 (Classification)': time_data.get('nouveaux_reports', [])
+            }
+        )
+        st.plotly_chart(line_fig, use_container_width=True)
+
+        st.divider()
+
+        # Statut des rapports par jour (Phase 2)
+        if status_ts['dates']:
+            st.subheader("Statut des rapports par jour (Phase 2)")
+            status_fig = cached_time_series(
+                dates=status_ts['dates'],
+                values_dict={
+                    'Rapports actifs': status_ts['active_reports'],
+                    'Rapports inactifs': status_ts['inactive_reports']
+                }
+            )
+            st.plotly_chart(status_fig, use_container_width=True)
+
+            st.subheader("Clients actifs cumulés (dernier état au fil du temps)")
+            active_cum_fig = cached_time_series(
+                dates=status_ts['dates'],
+                values_dict={
+                    'Clients actifs (cumul)': status_ts['active_clients_cumulative'],
+                    'Clients inactifs (cumul)': status_ts['inactive_clients_cumulative']
+                }
+            )
+            st.plotly_chart(active_cum_fig, use_container_width=True)
+    else:
+        st.info("ℹ️ Aucune donnée temporelle pour la période sélectionnée. Essayez 'Tout l'historique' dans les filtres.")
+
+
+@st.fragment
+def render_concurrence(data, calc):
+    """Section Concurrence"""
+    st.header("🎯 Analyse concurrentielle")
+
+    ads_kpis = calc.get_ads_kpis()
+
+    if not ads_kpis['has_phase2_data']:
+        st.warning("⚠️ Phase 2 non complétée - Lancez Phase 2 pour voir l'analyse concurrentielle")
+        st.code("python phase2_main.py", language="bash")
+    else:
+        # Afficher la date de dernière analyse
+        if data.get('latest_report'):
+            # Les dates sont normalisées en chaînes ISO au niveau DataLoader
+            latest_date = str(data['latest_report'].get('analyzed_at', 'N/A'))[:19]
+            st.caption(f"📅 Dernière analyse Phase 2: {latest_date}")
+
+        st.divider()
+
+        # Top concurrents
+        st.subheader("Top 10 Concurrents")
+        top_competitors = calc.get_top_competitors(limit=10)
+
+        if top_competitors:
+            comp_df = pd.DataFrame(top_competitors)
+
+            # Bar chart horizontal
+            comp_fig = cached_bar_chart(
+                labels=comp_df['domain'].tolist(),
+                values=comp_df['count'].tolist(),
+                title="Nombre de publicités par concurrent",
+                horizontal=True
+            )
+            st.plotly_chart(comp_fig, use_container_width=True)
+
+            st.divider()
+
+            # Répartition plateformes
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.subheader("Répartition par plateforme")
+                platform_dist = calc.get_platform_distribution()
+                if platform_dist:
+                    platform_fig = cached_pie_chart(
+                        labels=list(platform_dist.keys()),
+                        values=list(platform_dist.values()),
+                        title="Plateformes concurrentes"
+                    )
+                    st.plotly_chart(platform_fig, use_container_width=True)
+
+            with col2:
+                st.subheader("Table des concurrents")
+                st.dataframe(
+                    comp_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "domain": "Domaine",
+                        "count": st.column_config.NumberColumn("Publicités", format="%d"),
+                        "platform": "Plateforme"
+                    }
+                )
+        else:
+            st.info("Aucun concurrent identifié pour le moment")
+
+
+@st.fragment
+def render_client_details(calc, status_filter, min_ads, search_query):
+    """Section Détails clients"""
+    st.header("📋 Détails par client")
+
+    # Appliquer filtres
+    status_map = {
+        "Tous": None,
+        "Actifs uniquement": "active",
+        "Inactifs uniquement": "inactive"
     }
-</style>
-""", unsafe_allow_html=True)
 
+    table_data = calc.get_client_table_data()
+
+    if table_data:
+        df = pd.DataFrame(table_data)
+
+        # Appliquer tous les filtres en un seul masque vectorisé pandas
+        mask = df['total_ads'] >= min_ads
+        if status_map[status_filter]:
+            mask &= df['status'].eq(status_map[status_filter])
+        if search_query:
+            # Recherche déléguée à MongoDB (index client_id) plutôt
+            # qu'un scan en Python sur toute la table
+            matching_ids = search_clients(search_query,
+                                          st.session_state.refresh_key)
+            mask &= df['client_id'].isin(matching_ids)
+        df = df.loc[mask]
+
+        st.caption(f"**{len(df)} clients** correspondent aux filtres")
+
+        # Ajout : historique d'exécution par client
+        with st.expander("🔍 Voir l'historique d'exécution d'un client"):
+            client_ids = df['client_id'].tolist()
+            if client_ids:
+                selected_client = st.selectbox("Sélectionnez un client", client_ids)
+
+                if selected_client:
+                    history = load_client_history(selected_client,
+                                                  st.session_state.refresh_key)
+
+                    if history:
+                        st.subheader(f"Historique pour {selected_client}")
+
+                        # Convertir en DataFrame pour affichage
+                        history_df = pd.DataFrame(history)
+
+                        # Formater les dates (déjà normalisées en ISO par le
+                        # DataLoader): troncature vectorisée en C
+                        history_df['date'] = history_df['date'].astype(str).str.slice(0, 19)
+
+                        st.dataframe(
+                            history_df,
+                            use_container_width=True,
+                            hide_index=True
+                        )
+                    else:
+                        st.info("Aucun historique trouvé pour ce client")
+
+        st.divider()
+
+        # Table interactive
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "client_id": "Client ID",
+                "status": st.column_config.TextColumn(
+                    "Statut",
+                    help="Statut du client"
+                ),
+                "total_ads": st.column_config.NumberColumn(
+                    "Total Ads",
+                    format="%d"
+                ),
+                "converty_pct": st.column_config.NumberColumn(
+                    "Converty %",
+                    format="%.1f%%"
+                ),
+                "top_competitor": "Top Concurrent",
+                "last_activity": "Dernière activité"
+            },
+            height=600
+        )
+
+        # Export CSV. Le watermark last_ts du cache incrémental entre
+        # dans la clé: des upserts en place modifient les cellules sans
+        # changer le nombre de lignes filtrées, et sans signal de
+        # contenu le bouton servirait un CSV périmé indéfiniment
+        df_fingerprint = (f"{_doc_cache()['last_ts']}-{len(df)}-"
+                          f"{min_ads}-{status_filter}-{search_query}")
+        csv = to_csv_bytes(df_fingerprint, df)
+        st.download_button(
+            label="📥 Télécharger CSV",
+            data=csv,
+            file_name=f"converty_clients_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
+    else:
+        st.warning("Aucun client ne correspond aux filtres")
+
+
+@st.fragment
+def render_alerts(calc):
+    """Section Alertes"""
+    st.header("⚠️ Alertes & Recommandations")
+
+    overview_kpis = calc.get_overview_kpis()
+    ads_kpis = calc.get_ads_kpis()
+
+    # Alertes critiques
+    st.subheader("🚨 Alertes critiques")
+
+    alert_col1, alert_col2 = st.columns(2)
+
+    with alert_col1:
+        if overview_kpis['ratio_actifs'] < 10:
+            st.error(f"⚠️ Seulement {overview_kpis['ratio_actifs']:.1f}% de clients actifs !")
+        else:
+            st.success(f"✅ {overview_kpis['ratio_actifs']:.1f}% de clients actifs")
+
+    with alert_col2:
+        if ads_kpis['has_phase2_data'] and ads_kpis['ratio_converty'] < 50:
+            st.error(f"⚠️ Ratio Converty faible : {ads_kpis['ratio_converty']:.1f}%")
+        elif ads_kpis['has_phase2_data']:
+            st.success(f"✅ Bon ratio Converty : {ads_kpis['ratio_converty']:.1f}%")
+
+    st.divider()
+
+    # Recommandations
+    st.subheader("💡 Recommandations")
+
+    reco1, reco2, reco3 = st.columns(3)
+
+    with reco1:
+        st.info(f"📊 **{overview_kpis['clients_restants']:,} clients restants**\n\nContinuer Phase 1 pour compléter le mapping")
+
+    with reco2:
+        if not ads_kpis['has_phase2_data']:
+            st.warning("⚠️ **Phase 2 non lancée**\n\nLancer la classification des concurrents")
+        else:
+            st.success("✅ **Phase 2 complétée**\n\nDonnées de concurrence disponibles")
+
+    with reco3:
+        inactive_count = overview_kpis['inactifs']
+        st.warning(f"🔴 **{inactive_count} clients inactifs**\n\nVérification manuelle recommandée")
 
-@st.cache_data(ttl=15)
-def load_all_data(refresh_key: int):
-    """Charger toutes les données depuis MongoDB (avec cache)"""
-    loader = DataLoader()
-    data = loader.get_all_data()
-    loader.close()
-    return data
 
 
 def main():
@@ -65,7 +621,10 @@ def main():
     if 'last_refresh' not in st.session_state:
         st.session_state.last_refresh = datetime.now()
     if 'refresh_key' not in st.session_state:
-        st.session_state.refresh_key = int(st.session_state.last_refresh.timestamp())
+        # Compteur borné plutôt qu'un timestamp monotone: une clé qui ne
+        # se répète jamais garantit 100% de cache miss à chaque refresh,
+        # alors qu'un petit cycle laisse les TTL faire leur travail
+        st.session_state.refresh_key = 0
     
     col_refresh1, col_refresh2, col_refresh3 = st.columns([2, 1, 1])
     with col_refresh1:
@@ -74,7 +633,7 @@ def main():
         if st.button("🔄 Rafraîchir", use_container_width=True):
             # Buster le cache en changeant une clé d'argument
             st.session_state.last_refresh = datetime.now()
-            st.session_state.refresh_key = int(st.session_state.last_refresh.timestamp())
+            st.session_state.refresh_key = (st.session_state.refresh_key + 1) % 8
             st.rerun()
     with col_refresh3:
         auto_refresh = st.checkbox("Auto-refresh 30s", value=False)
@@ -93,9 +652,15 @@ def main():
         f"chargées à {data.get('loaded_at').strftime('%d/%m/%Y %H:%M:%S')}"
     )
     
-    # Initialiser calculateur et générateur de charts
-    calc = MetricsCalculator(data)
-    charts = ChartGenerator()
+    # Initialiser calculateur et générateur de charts (singletons cachés).
+    # Le watermark last_ts du cache incrémental sert de signal de contenu:
+    # les upserts en place changent les documents sans changer les
+    # longueurs, et refresh_key cycle modulo 8 — seuls, ils laisseraient
+    # un calculateur périmé en cache indéfiniment
+    fingerprint = (f"{len(data['stores'])}-{len(data['mappings'])}-"
+                   f"{len(data['reports'])}-{_doc_cache()['last_ts']}-"
+                   f"{st.session_state.refresh_key}")
+    calc = get_calc(fingerprint, data)
     
     # ==================== SIDEBAR - FILTRES ====================
     st.sidebar.header("🎛️ Filtres & Navigation")
@@ -140,406 +705,23 @@ def main():
         index=0
     )
     
-    # ==================== SECTION 1: VUE D'ENSEMBLE ====================
+    # ==================== SECTIONS (fragments) ====================
+    # Chaque section est un @st.fragment: une interaction avec un widget
+    # interne à la section ne ré-exécute que la section, pas tout le script
     if page == "Vue d'ensemble":
-        st.header("📊 Vue d'ensemble")
-        
-        # KPIs principaux
-        overview_kpis = calc.get_overview_kpis()
-        ads_kpis = calc.get_ads_kpis()
-        
-        # Progress bar globale
-        st.subheader("Progression du traitement")
-        st.progress(overview_kpis['progression'] / 100)
-        st.caption(f"**{overview_kpis['clients_traités']:,} / {overview_kpis['total_clients']:,} clients traités** ({overview_kpis['progression']:.1f}%)")
-        
-        st.divider()
-        
-        # Métriques en colonnes
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric(
-                label="📦 Total Clients",
-                value=f"{overview_kpis['total_clients']:,}",
-                delta=f"{overview_kpis['clients_restants']:,} restants"
-            )
-        
-        with col2:
-            st.metric(
-                label="🟢 Clients Actifs",
-                value=f"{overview_kpis['actifs']:,}",
-                delta=f"{overview_kpis['ratio_actifs']:.1f}%"
-            )
-        
-        with col3:
-            st.metric(
-                label="🔴 Clients Inactifs",
-                value=f"{overview_kpis['inactifs']:,}",
-                delta=f"{overview_kpis['ratio_inactifs']:.1f}%"
-            )
-        
-        with col4:
-            st.metric(
-                label="📊 Total Publicités",
-                value=f"{ads_kpis['total_ads']:,}",
-                delta="Depuis Phase 1"
-            )
-        
-        st.divider()
-        
-        # Row 2
-        col5, col6, col7 = st.columns(3)
-        
-        with col5:
-            if ads_kpis['has_phase2_data']:
-                st.metric(
-                    label="✅ Publicités Converty",
-                    value=f"{ads_kpis['converty_ads']:,}",
-                    delta=f"{ads_kpis['ratio_converty']:.1f}%"
-                )
-            else:
-                st.info("ℹ️ Phase 2 non complétée - Pas de données de classification")
-        
-        with col6:
-            if ads_kpis['has_phase2_data']:
-                st.metric(
-                    label="⚠️ Publicités Concurrents",
-                    value=f"{ads_kpis['competitor_ads']:,}",
-                    delta=f"{100 - ads_kpis['ratio_converty']:.1f}%"
-                )
-        
-        with col7:
-            st.metric(
-                label="📈 Ratio Converty",
-                value=f"{ads_kpis['ratio_converty']:.1f}%" if ads_kpis['has_phase2_data'] else "N/A",
-                delta="Objectif: >70%"
-            )
-        
-        st.divider()
-        
-        # Graphiques côte à côte
-        chart_col1, chart_col2 = st.columns(2)
-        
-        with chart_col1:
-            st.subheader("Répartition Actifs/Inactifs")
-            pie_fig = charts.create_pie_chart(
-                labels=['Actifs', 'Inactifs'],
-                values=[overview_kpis['actifs'], overview_kpis['inactifs']],
-                title="Statut des clients traités"
-            )
-            st.plotly_chart(pie_fig, use_container_width=True)
-        
-        with chart_col2:
-            st.subheader("Distribution Clients ACTIFS (Phase 2)")
-            dist_data_active = calc.get_activity_distribution()
-            bar_fig_active = charts.create_bar_chart(
-                labels=dist_data_active['bins'],
-                values=dist_data_active['counts'],
-                title=f"Clients Actifs: {sum(dist_data_active['counts'])} clients",
-                horizontal=False
-            )
-            st.plotly_chart(bar_fig_active, use_container_width=True)
-        
-        # Deuxième ligne pour les inactifs
-        st.divider()
-        st.subheader("📊 Distribution Clients INACTIFS (Phase 1)")
-        
-        col_inactive1, col_inactive2 = st.columns(2)
-        
-        with col_inactive1:
-            dist_data_inactive = calc.get_activity_distribution_inactive()
-            bar_fig_inactive = charts.create_bar_chart(
-                labels=dist_data_inactive['bins'],
-                values=dist_data_inactive['counts'],
-                title=f"Clients Inactifs: {sum(dist_data_inactive['counts'])} clients",
-                horizontal=False
-            )
-            st.plotly_chart(bar_fig_inactive, use_container_width=True)
-        
-        with col_inactive2:
-            st.info("""
-            **📌 Explication:**
-            - **Actifs (Phase 2)** : Clients avec des publicités détectées lors du dernier scan
-            - **Inactifs (Phase 1)** : Clients sans publicités lors de la Phase 1 initiale
-            
-            ⚠️ Un client peut passer de "Actif" à "Inactif" entre deux runs si ses publicités sont supprimées
-            """)
-    
-    # ==================== SECTION 2: ANALYSE TEMPORELLE ====================
+        render_overview(calc)
     elif page == "Analyse temporelle":
-        st.header("📈 Analyse temporelle")
-        
-        time_data = calc.get_time_series_data(days=period_days)
-        status_ts = calc.get_status_time_series(days=period_days)
-        
-        if time_data['dates']:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.metric("📊 Période analysée", f"{len(time_data['dates'])} jours")
-            with col2:
-                st.metric("🆕 Total traité", sum(time_data['nouveaux_clients']))
-            
-            st.divider()
-            
-            st.subheader("Évolution du traitement")
-            area_fig = charts.create_area_chart(
-                dates=time_data['dates'],
-                values=time_data['cumul_clients'],
-                label="Clients traités (cumulé)"
-            )
-            st.plotly_chart(area_fig, use_container_width=True)
-            
-            st.divider()
-            
-            st.subheader("Nouveaux clients traités par jour")
-            line_fig = charts.create_time_series(
-                dates=time_data['dates'],
-                values_dict={
-                    'Phase 1 (Discovery)': time_data['nouveaux_clients'],
-                    'Phase 2 (Classification)': time_data.get('nouveaux_reports', [])
-                }
-            )
-            st.plotly_chart(line_fig, use_container_width=True)
-
-            st.divider()
-
-            # Statut des rapports par jour (Phase 2)
-            if status_ts['dates']:
-                st.subheader("Statut des rapports par jour (Phase 2)")
-                status_fig = charts.create_time_series(
-                    dates=status_ts['dates'],
-                    values_dict={
-                        'Rapports actifs': status_ts['active_reports'],
-                        'Rapports inactifs': status_ts['inactive_reports']
-                    }
-                )
-                st.plotly_chart(status_fig, use_container_width=True)
-
-                st.subheader("Clients actifs cumulés (dernier état au fil du temps)")
-                active_cum_fig = charts.create_time_series(
-                    dates=status_ts['dates'],
-                    values_dict={
-                        'Clients actifs (cumul)': status_ts['active_clients_cumulative'],
-                        'Clients inactifs (cumul)': status_ts['inactive_clients_cumulative']
-                    }
-                )
-                st.plotly_chart(active_cum_fig, use_container_width=True)
-        else:
-            st.info("ℹ️ Aucune donnée temporelle pour la période sélectionnée. Essayez 'Tout l'historique' dans les filtres.")
-    
-    # ==================== SECTION 3: CONCURRENCE ====================
+        render_temporal(calc, period_days)
     elif page == "Concurrence":
-        st.header("🎯 Analyse concurrentielle")
-        
-        ads_kpis = calc.get_ads_kpis()
-        
-        if not ads_kpis['has_phase2_data']:
-            st.warning("⚠️ Phase 2 non complétée - Lancez Phase 2 pour voir l'analyse concurrentielle")
-            st.code("python phase2_main.py", language="bash")
-        else:
-            # Afficher la date de dernière analyse
-            if data['reports']:
-                latest_report = max(data['reports'], key=lambda r: r.get('analyzed_at', ''))
-                latest_date = latest_report.get('analyzed_at', 'N/A')
-                if isinstance(latest_date, dict) and '$date' in latest_date:
-                    latest_date = latest_date['$date'][:19]
-                st.caption(f"📅 Dernière analyse Phase 2: {latest_date}")
-            
-            st.divider()
-            
-            # Top concurrents
-            st.subheader("Top 10 Concurrents")
-            top_competitors = calc.get_top_competitors(limit=10)
-            
-            if top_competitors:
-                comp_df = pd.DataFrame(top_competitors)
-                
-                # Bar chart horizontal
-                comp_fig = charts.create_bar_chart(
-                    labels=comp_df['domain'].tolist(),
-                    values=comp_df['count'].tolist(),
-                    title="Nombre de publicités par concurrent",
-                    horizontal=True
-                )
-                st.plotly_chart(comp_fig, use_container_width=True)
-                
-                st.divider()
-                
-                # Répartition plateformes
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("Répartition par plateforme")
-                    platform_dist = calc.get_platform_distribution()
-                    if platform_dist:
-                        platform_fig = charts.create_pie_chart(
-                            labels=list(platform_dist.keys()),
-                            values=list(platform_dist.values()),
-                            title="Plateformes concurrentes"
-                        )
-                        st.plotly_chart(platform_fig, use_container_width=True)
-                
-                with col2:
-                    st.subheader("Table des concurrents")
-                    st.dataframe(
-                        comp_df,
-                        use_container_width=True,
-                        hide_index=True,
-                        column_config={
-                            "domain": "Domaine",
-                            "count": st.column_config.NumberColumn("Publicités", format="%d"),
-                            "platform": "Plateforme"
-                        }
-                    )
-            else:
-                st.info("Aucun concurrent identifié pour le moment")
-    
-    # ==================== SECTION 4: DÉTAILS CLIENTS ====================
+        render_concurrence(data, calc)
     elif page == "Détails clients":
-        st.header("📋 Détails par client")
-        
-        # Appliquer filtres
-        status_map = {
-            "Tous": None,
-            "Actifs uniquement": "active",
-            "Inactifs uniquement": "inactive"
-        }
-        
-        table_data = calc.get_client_table_data(
-            status_filter=status_map[status_filter],
-            search_query=search_query if search_query else None
-        )
-        
-        if table_data:
-            df = pd.DataFrame(table_data)
-            
-            # Filtrer par min_ads
-            df = df[df['total_ads'] >= min_ads]
-            
-            st.caption(f"**{len(df)} clients** correspondent aux filtres")
-            
-            # Ajout : historique d'exécution par client
-            with st.expander("🔍 Voir l'historique d'exécution d'un client"):
-                client_ids = df['client_id'].tolist()
-                if client_ids:
-                    selected_client = st.selectbox("Sélectionnez un client", client_ids)
-                    
-                    if selected_client:
-                        history = calc.get_client_execution_history(selected_client)
-                        
-                        if history:
-                            st.subheader(f"Historique pour {selected_client}")
-                            
-                            # Convertir en DataFrame pour affichage
-                            history_df = pd.DataFrame(history)
-                            
-                            # Formater les dates
-                            def format_date(date_val):
-                                if isinstance(date_val, dict) and '$date' in date_val:
-                                    return date_val['$date'][:19]
-                                elif isinstance(date_val, str):
-                                    return date_val[:19]
-                                return str(date_val)
-                            
-                            history_df['date'] = history_df['date'].apply(format_date)
-                            
-                            st.dataframe(
-                                history_df,
-                                use_container_width=True,
-                                hide_index=True
-                            )
-                        else:
-                            st.info("Aucun historique trouvé pour ce client")
-            
-            st.divider()
-            
-            # Table interactive
-            st.dataframe(
-                df,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "client_id": "Client ID",
-                    "status": st.column_config.TextColumn(
-                        "Statut",
-                        help="Statut du client"
-                    ),
-                    "total_ads": st.column_config.NumberColumn(
-                        "Total Ads",
-                        format="%d"
-                    ),
-                    "converty_pct": st.column_config.NumberColumn(
-                        "Converty %",
-                        format="%.1f%%"
-                    ),
-                    "top_competitor": "Top Concurrent",
-                    "last_activity": "Dernière activité"
-                },
-                height=600
-            )
-            
-            # Export CSV
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Télécharger CSV",
-                data=csv,
-                file_name=f"converty_clients_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.warning("Aucun client ne correspond aux filtres")
-    
-    # ==================== SECTION 5: ALERTES ====================
+        render_client_details(calc, status_filter, min_ads, search_query)
     elif page == "Alertes":
-        st.header("⚠️ Alertes & Recommandations")
-        
-        overview_kpis = calc.get_overview_kpis()
-        ads_kpis = calc.get_ads_kpis()
-        
-        # Alertes critiques
-        st.subheader("🚨 Alertes critiques")
-        
-        alert_col1, alert_col2 = st.columns(2)
-        
-        with alert_col1:
-            if overview_kpis['ratio_actifs'] < 10:
-                st.error(f"⚠️ Seulement {overview_kpis['ratio_actifs']:.1f}% de clients actifs !")
-            else:
-                st.success(f"✅ {overview_kpis['ratio_actifs']:.1f}% de clients actifs")
-        
-        with alert_col2:
-            if ads_kpis['has_phase2_data'] and ads_kpis['ratio_converty'] < 50:
-                st.error(f"⚠️ Ratio Converty faible : {ads_kpis['ratio_converty']:.1f}%")
-            elif ads_kpis['has_phase2_data']:
-                st.success(f"✅ Bon ratio Converty : {ads_kpis['ratio_converty']:.1f}%")
-        
-        st.divider()
-        
-        # Recommandations
-        st.subheader("💡 Recommandations")
-        
-        reco1, reco2, reco3 = st.columns(3)
-        
-        with reco1:
-            st.info(f"📊 **{overview_kpis['clients_restants']:,} clients restants**\n\nContinuer Phase 1 pour compléter le mapping")
-        
-        with reco2:
-            if not ads_kpis['has_phase2_data']:
-                st.warning("⚠️ **Phase 2 non lancée**\n\nLancer la classification des concurrents")
-            else:
-                st.success("✅ **Phase 2 complétée**\n\nDonnées de concurrence disponibles")
-        
-        with reco3:
-            inactive_count = overview_kpis['inactifs']
-            st.warning(f"🔴 **{inactive_count} clients inactifs**\n\nVérification manuelle recommandée")
-    
-    # Auto-refresh
+        render_alerts(calc)
+
+    # Auto-refresh (fragment planifié, ne bloque pas le worker)
     if auto_refresh:
-        import time
-        time.sleep(30)
-        st.rerun()
+        auto_refresh_tick()
 
 
 if __name__ == "__main__":
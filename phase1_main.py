@@ -2,66 +2,123 @@
 Point d'entrée principal - Phase 1: Discovery & Mapping
 """
 import json
-import time
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from itertools import islice
+from bson import ObjectId
+from bson.errors import InvalidId
 from config.settings import settings
-from src.database.mongo_client import MongoDBClient
+from src.database.mongo_client import get_mongo_client
 from src.discovery.site_mapper import SiteMapper
 from src.utils.logger import setup_logger
 from src.utils.batch_manager import BatchManager
 from src.utils.cost_tracker import CostTracker
+from src.utils.domains import normalize_domain
 from src.utils.mapper_saver import MongoMapperSaver
+from src.utils.rate_limiter import TokenBucket
 
 logger = setup_logger(__name__)
 
+# Budget d'appels Apify partagé par tous les workers (1 jeton = 1 client)
+_apify_bucket = TokenBucket(rate_per_sec=settings.APIFY_RATE_PER_SEC)
 
-def load_clients_batch(skip: int = 0, limit: int = 30) -> list:
+# Clients traités en parallèle au sein d'un batch (borne basse pour
+# respecter le budget de requêtes Apify)
+MAX_WORKERS = 8
+
+# Checkpoint de reprise: dernier _id de store dont le batch a été persisté
+CHECKPOINT_FILE = "data/output/phase1_checkpoint.json"
+
+
+def load_checkpoint() -> dict:
     """
-    Charger un batch de clients depuis MongoDB
+    Charger le checkpoint de reprise Phase 1
+
+    Returns:
+        {'last_id': str, 'batch_number': int} ou {} si aucun checkpoint
+    """
+    try:
+        with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_checkpoint(last_id, batch_number: int):
+    """
+    Écrire le checkpoint de reprise de façon atomique
+
+    Écriture dans un fichier temporaire puis os.replace: un crash en
+    pleine écriture ne peut pas laisser un checkpoint corrompu.
+    """
+    os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+    tmp_path = CHECKPOINT_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'last_id': str(last_id),
+            'batch_number': batch_number,
+            'saved_at': datetime.now().isoformat()
+        }, f, indent=2)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+
+def normalize_stores(stores: list) -> list:
+    """
+    Normaliser un lot de documents stores en clients Phase 1
     """
-    mongo_client = MongoDBClient()
-    stores = list(mongo_client.db.stores.find().skip(skip).limit(limit))
-    
-    logger.info(f"🔍 Batch: {len(stores)} clients (skip={skip}, limit={limit})")
     normalized_clients = []
-    
+
     for store in stores:
         slug = store.get('slug')
         domain = store.get('domain')
         
         if not domain:
             domain = f"{slug}.converty.shop"
-        
-        domaines = [domain] if domain else []
-        
-        if not slug or not domaines:
+
+        if not slug:
             logger.warning(f"⚠ Client ignoré: {slug}")
             continue
-        
-        # Nettoyer les domaines
-        cleaned_sites = []
-        for domaine in domaines:
-            domaine = domaine.strip()
-            if domaine.startswith('https://'):
-                domaine = domaine[8:]
-            elif domaine.startswith('http://'):
-                domaine = domaine[7:]
-            domaine = domaine.rstrip('/')
-            
-            if domaine:
-                cleaned_sites.append(domaine)
-        
-        if not cleaned_sites:
+
+        # Nettoyer le domaine (normalisation mémoïsée, partagée avec la
+        # Phase 2)
+        cleaned = normalize_domain(domain)
+
+        if not cleaned:
             continue
-        
+
         normalized_clients.append({
             'client_id': slug,
-            'sites': cleaned_sites
+            'sites': [cleaned]
         })
-    
+
     return normalized_clients
 
 
+def iter_client_batches(cursor, batch_size: int):
+    """
+    Générateur de batches de clients normalisés depuis un curseur unique
+
+    Un seul curseur serveur pour tout le run (batch_size aligné sur la
+    taille de traitement): plus de reconnexion MongoDB ni de
+    re-planification de requête à chaque batch.
+    """
+    while True:
+        stores = list(islice(cursor, batch_size))
+        if not stores:
+            return
+
+        clients = normalize_stores(stores)
+        logger.info(f"🔍 Batch: {len(clients)} clients normalisés "
+                    f"({len(stores)} stores lus)")
+        if clients:
+            # Le dernier _id lu sert de checkpoint de reprise une fois
+            # le batch persisté
+            yield clients, stores[-1]['_id']
+
+
 def process_batch(batch_number: int, clients: list, mapper: SiteMapper, 
                   batch_manager: BatchManager, cost_tracker: CostTracker,
                   mongo_saver: MongoMapperSaver):
@@ -83,41 +140,145 @@ def process_batch(batch_number: int, clients: list, mapper: SiteMapper,
         'clients': []
     }
     
-    for idx, client in enumerate(clients, 1):
-        client_id = client['client_id']
-        logger.info(f"\n[{idx}/{len(clients)}] 🔄 Traitement: {client_id}")
-        
-        # Vérifier si déjà traité dans MongoDB
-        if mongo_saver.is_already_processed(client_id):
-            logger.info(f"✅ {client_id} déjà dans MongoDB, skip")
-            batch_results['clients'].append({
-                'client_id': client_id,
-                'mapping_done': True,
-                'status': 'skipped',
-                'message': 'Déjà dans MongoDB'
-            })
-            batch_results['skipped'] += 1
+    # Timestamp unique pour tout le batch: inutile de payer un appel
+    # datetime.now() + formatage par client
+    batch_ts = datetime.now().isoformat()
+
+    # Pré-vérification groupée: une seule requête $in au lieu d'un
+    # aller-retour MongoDB par client
+    already_processed = mongo_saver.get_already_processed(
+        [c['client_id'] for c in clients]
+    )
+
+    # Les clients d'un batch sont indépendants et dominés par l'I/O réseau
+    # (Apify + MongoDB): un pool de threads borné fait converger la durée du
+    # batch vers la latence du client le plus lent au lieu de la somme
+    state_lock = threading.Lock()
+    status_counters = {'success': 'successful', 'failed': 'failed', 'skipped': 'skipped'}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                _process_one_client, client, batch_number, batch_ts,
+                mapper, batch_manager, cost_tracker, mongo_saver,
+                already_processed, state_lock
+            ): client['client_id']
+            for client in clients
+        }
+
+        pending_documents = []
+        for idx, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            logger.info(f"[{idx}/{len(clients)}] ✔ Terminé: {result['client_id']} "
+                        f"({result['status']})")
+            document = result.pop('document', None)
+            if document is not None:
+                pending_documents.append(document)
+            batch_results['clients'].append(result)
+            batch_results[status_counters[result['status']]] += 1
+
+    # Flush des mappings du batch en un seul bulk_write (1 RTT au lieu
+    # d'une écriture par client)
+    batch_results['bulk_write_ok'] = True
+    if not mongo_saver.bulk_save_mappings(pending_documents):
+        logger.error(f"❌ Échec bulk_write du batch #{batch_number} "
+                     f"({len(pending_documents)} documents)")
+        # Les résultats Apify de ces clients n'ont PAS été persistés:
+        # les requalifier en échec pour qu'une reprise les retraite au
+        # lieu de les sauter définitivement
+        _mark_bulk_write_failure(batch_number, batch_results, batch_manager)
+
+    # Enregistrer le coût du batch et cumuler les totaux du run
+    cost_tracker.end_batch(batch_number, len(clients))
+    cost_tracker.record_batch_totals(batch_results)
+
+    return batch_results
+
+
+def _mark_bulk_write_failure(batch_number: int, batch_results: dict,
+                             batch_manager: BatchManager):
+    """
+    Requalifier en échec les clients d'un batch dont le bulk_write a échoué
+
+    Leurs mappings n'ont jamais atteint MongoDB: sans cela ils resteraient
+    comptés « success » dans batch_manager et le checkpoint avancerait
+    au-delà, perdant silencieusement des résultats Apify déjà payés.
+    """
+    error = f"bulk_write du batch #{batch_number} échoué, mapping non persisté"
+
+    for result in batch_results['clients']:
+        if result['status'] != 'success':
             continue
-        
-        try:
-            # Traiter le client
-            mapping = mapper.map_client_sites(client)
-            
-            # Préparer les métadonnées
-            processing_metadata = {
-                'batch_number': batch_number,
-                'processing_timestamp': datetime.now().isoformat(),
-                'sites_count': len(client['sites']),
-                'total_ads': sum(m['total_ads'] for m in mapping['mappings']),
-                'fb_pages_found': sum(len(m['fb_pages']) for m in mapping['mappings'])
-            }
-            
-            # Sauvegarder dans MongoDB
-            success = mongo_saver.save_mapping(mapping, processing_metadata)
-            
-            if not success:
-                raise Exception("Échec sauvegarde MongoDB")
-            
+        result['status'] = 'failed'
+        result['mapping_done'] = False
+        result['error'] = error
+        batch_results['successful'] -= 1
+        batch_results['failed'] += 1
+
+        # Reset puis re-marquage pour garder les statistiques cohérentes
+        # (mark_as_processed seul incrémenterait total_processed deux fois)
+        batch_manager.reset_specific_client(result['client_id'])
+        batch_manager.mark_as_processed(
+            client_id=result['client_id'],
+            status='failed',
+            error=error
+        )
+
+    batch_results['bulk_write_ok'] = False
+
+
+def _process_one_client(client: dict, batch_number: int, batch_ts: str,
+                        mapper: SiteMapper, batch_manager: BatchManager,
+                        cost_tracker: CostTracker,
+                        mongo_saver: MongoMapperSaver, already_processed: set,
+                        state_lock: threading.Lock) -> dict:
+    """
+    Traiter un seul client (exécuté dans le pool de threads)
+
+    Les écritures MongoDB sont thread-safe (pymongo); les mises à jour
+    de batch_manager et cost_tracker sont protégées par state_lock.
+    """
+    client_id = client['client_id']
+    logger.info(f"🔄 Traitement: {client_id}")
+
+    # Vérifier si déjà traité (ensemble pré-chargé pour tout le batch)
+    if client_id in already_processed:
+        logger.info(f"✅ {client_id} déjà dans MongoDB, skip")
+        return {
+            'client_id': client_id,
+            'mapping_done': True,
+            'status': 'skipped',
+            'message': 'Déjà dans MongoDB'
+        }
+
+    try:
+        # Respecter le débit Apify global (bucket partagé entre threads)
+        _apify_bucket.acquire()
+
+        # Traiter le client
+        mapping = mapper.map_client_sites(client)
+
+        # Agréger ads et pages FB en un seul parcours des mappings
+        total_ads = 0
+        fb_pages_found = 0
+        for m in mapping['mappings']:
+            total_ads += m['total_ads']
+            fb_pages_found += len(m['fb_pages'])
+
+        # Préparer les métadonnées
+        processing_metadata = {
+            'batch_number': batch_number,
+            'processing_timestamp': batch_ts,
+            'sites_count': len(client['sites']),
+            'total_ads': total_ads,
+            'fb_pages_found': fb_pages_found
+        }
+
+        # Construire le document sans l'écrire: les documents du batch
+        # sont bufferisés puis flushés en un seul bulk_write
+        document = mongo_saver.build_mapping_document(mapping, processing_metadata)
+
+        with state_lock:
             # Enregistrer dans le batch manager
             batch_manager.mark_as_processed(
                 client_id=client_id,
@@ -125,63 +286,61 @@ def process_batch(batch_number: int, clients: list, mapper: SiteMapper,
                 mapping_file=f"mongodb://ads_metrics/{client_id}",
                 metadata=processing_metadata
             )
-            
+
             # Enregistrer le client dans le cost tracker
             cost_tracker.record_client(client_id, processing_metadata)
-            
-            batch_results['clients'].append({
-                'client_id': client_id,
-                'mapping_done': True,
-                'status': 'success',
-                'sites_processed': len(client['sites']),
-                'total_ads': processing_metadata['total_ads'],
-                'fb_pages': processing_metadata['fb_pages_found']
-            })
-            batch_results['successful'] += 1
-            
-            logger.info(f"✅ {client_id} traité et sauvegardé dans MongoDB")
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur sur {client_id}: {str(e)}")
-            
-            # Marquer comme échoué dans MongoDB
-            mongo_saver.mark_as_failed(
-                client_id=client_id,
-                error=str(e),
-                processing_metadata={
-                    'batch_number': batch_number,
-                    'error_timestamp': datetime.now().isoformat()
-                }
-            )
-            
+
+        logger.info(f"✅ {client_id} traité, document prêt pour le bulk_write")
+
+        return {
+            'client_id': client_id,
+            'mapping_done': True,
+            'status': 'success',
+            'sites_processed': len(client['sites']),
+            'total_ads': processing_metadata['total_ads'],
+            'fb_pages': processing_metadata['fb_pages_found'],
+            'document': document
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Erreur sur {client_id}: {str(e)}")
+        # Traceback matérialisé uniquement si le niveau DEBUG est actif
+        logger.debug("Trace de l'erreur client", exc_info=True)
+
+        # Marquer comme échoué dans MongoDB
+        mongo_saver.mark_as_failed(
+            client_id=client_id,
+            error=str(e),
+            processing_metadata={
+                'batch_number': batch_number,
+                'error_timestamp': batch_ts
+            }
+        )
+
+        with state_lock:
             # Enregistrer l'échec
             batch_manager.mark_as_processed(
                 client_id=client_id,
                 status='failed',
                 error=str(e)
             )
-            
-            batch_results['clients'].append({
-                'client_id': client_id,
-                'mapping_done': False,
-                'status': 'failed',
-                'error': str(e)
-            })
-            batch_results['failed'] += 1
-    
-    # Enregistrer le coût du batch
-    cost_tracker.end_batch(batch_number, len(clients))
-    
-    return batch_results
+
+        return {
+            'client_id': client_id,
+            'mapping_done': False,
+            'status': 'failed',
+            'error': str(e)
+        }
 
 
 def main():
     """Fonction principale"""
-    logger.info("\n" + "="*60)
-    logger.info("🚀 DÉMARRAGE - PHASE 1: DISCOVERY & MAPPING")
-    logger.info("📊 Sauvegarde: MongoDB (converty.ads_metrics)")
-    logger.info("💰 Coûts: API Apify RÉELS")
-    logger.info("="*60 + "\n")
+    # En-tête en un seul appel logger (une seule émission/flush)
+    logger.info("\n" + "="*60 + "\n"
+                "🚀 DÉMARRAGE - PHASE 1: DISCOVERY & MAPPING\n"
+                "📊 Sauvegarde: MongoDB (converty.ads_metrics)\n"
+                "💰 Coûts: API Apify RÉELS\n"
+                + "="*60 + "\n")
     
     try:
         # Valider la configuration
@@ -197,14 +356,28 @@ def main():
         # Paramètres du batch
         BATCH_SIZE = 30
         batch_number = 1
-        skip = 0
-        
-        # Compter le total de clients
-        mongo_client = MongoDBClient()
-        total_clients = mongo_client.db.stores.count_documents({})
+
+        # Reprise après interruption: le checkpoint borne la requête
+        # stores par _id, le coût de reprise devient O(clients restants)
+        # au lieu de rejouer toute la collection
+        stores_query = {}
+        checkpoint = load_checkpoint()
+        if checkpoint.get('last_id'):
+            try:
+                resume_id = ObjectId(checkpoint['last_id'])
+            except (InvalidId, TypeError):
+                resume_id = checkpoint['last_id']
+            stores_query = {'_id': {'$gt': resume_id}}
+            batch_number = checkpoint.get('batch_number', 0) + 1
+            logger.info(f"⏯️ Reprise depuis le checkpoint: _id > {checkpoint['last_id']} "
+                        f"(batch #{batch_number})")
+
+        # Compter le total de clients (client singleton du processus)
+        mongo_client = get_mongo_client()
+        total_clients = mongo_client.db.stores.count_documents(stores_query)
         total_batches = (total_clients + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        logger.info(f"📊 Total clients dans MongoDB: {total_clients}")
+
+        logger.info(f"📊 Total clients à traiter dans MongoDB: {total_clients}")
         logger.info(f"📦 Nombre de batches prévus: {total_batches}")
         logger.info(f"💰 Budget Apify: ${cost_tracker.budget_limit}\n")
         
@@ -216,124 +389,179 @@ def main():
                 logger.info(f"   • {status}: {data['count']} clients")
         print()
         
-        all_batch_results = []
-        
-        # Traiter les batches
-        while True:
-            # Vérifier le budget RÉEL
-            if cost_tracker.is_budget_exceeded():
-                session_cost = cost_tracker.get_session_cost()
-                logger.warning(f"\n⚠️ BUDGET DÉPASSÉ: ${session_cost:.2f}/${cost_tracker.budget_limit}")
-                logger.warning("Arrêt du traitement pour éviter les frais supplémentaires\n")
-                break
-            
-            # Charger le batch
-            clients = load_clients_batch(skip=skip, limit=BATCH_SIZE)
-            
-            if not clients:
-                logger.info("\n✅ Tous les clients ont été traités")
-                break
-            
-            # Traiter le batch
-            batch_results = process_batch(
-                batch_number=batch_number,
-                clients=clients,
-                mapper=mapper,
-                batch_manager=batch_manager,
-                cost_tracker=cost_tracker,
-                mongo_saver=mongo_saver
-            )
-            
-            all_batch_results.append(batch_results)
-            
-            # Afficher le résumé du batch
-            print_batch_summary(batch_results, cost_tracker)
-            
-            # Sauvegarder le progrès du batch
-            batch_manager.save_batch_progress(batch_number, batch_results)
-            
-            # Préparer le prochain batch
-            skip += BATCH_SIZE
-            batch_number += 1
-            
-            # Pause entre les batches (pour rate limiting)
-            time.sleep(2)
+        # Curseur serveur unique pour tout le run, streamé par batches.
+        # Projection minimale: la normalisation ne lit que slug/domain.
+        # Tri par _id: garantit la cohérence du checkpoint de reprise
+        cursor = mongo_client.db.stores.find(
+            stores_query, {'slug': 1, 'domain': 1, '_id': 1},
+            no_cursor_timeout=True
+        ).sort('_id', 1).batch_size(BATCH_SIZE)
+
+        # Pipeline à 3 étages avec files bornées: un thread pré-charge le
+        # batch suivant depuis Mongo pendant le traitement du batch courant,
+        # un thread écrit progrès + résumé pendant que le suivant démarre.
+        # Les lectures/écritures sortent ainsi du chemin critique.
+        load_q = queue.Queue(maxsize=2)
+        save_q = queue.Queue(maxsize=2)
+
+        def _loader():
+            """Étage 1: pré-charger les batches de clients"""
+            try:
+                for batch in iter_client_batches(cursor, BATCH_SIZE):
+                    load_q.put(batch)
+            finally:
+                load_q.put(None)  # Sentinelle de fin
+
+        def _writer():
+            """Étage 3: flusher résumés, progrès et checkpoint hors du chemin critique"""
+            checkpoint_blocked = False
+            while True:
+                item = save_q.get()
+                if item is None:
+                    break
+                number, results, last_id = item
+                print_batch_summary(results, cost_tracker)
+                batch_manager.save_batch_progress(number, results)
+                # Checkpoint écrit APRÈS la persistance du batch: une
+                # reprise ne peut pas sauter un batch non sauvegardé.
+                # Si un bulk_write a échoué, le checkpoint est gelé pour
+                # le reste du run — avancer _id au-delà ferait sauter
+                # ces clients à la reprise
+                if not results.get('bulk_write_ok', True):
+                    checkpoint_blocked = True
+                    logger.warning(f"⚠️ Checkpoint gelé: bulk_write du "
+                                   f"batch #{number} non persisté")
+                if not checkpoint_blocked:
+                    save_checkpoint(last_id, number)
+
+        loader_thread = threading.Thread(target=_loader, daemon=True)
+        writer_thread = threading.Thread(target=_writer, daemon=True)
+        loader_thread.start()
+        writer_thread.start()
+
+        try:
+            # Étage 2: traiter les batches
+            while True:
+                # Vérifier le budget RÉEL
+                if cost_tracker.is_budget_exceeded():
+                    session_cost = cost_tracker.get_session_cost()
+                    logger.warning(f"\n⚠️ BUDGET DÉPASSÉ: ${session_cost:.2f}/${cost_tracker.budget_limit}")
+                    logger.warning("Arrêt du traitement pour éviter les frais supplémentaires\n")
+                    break
+
+                item = load_q.get()
+                if item is None:
+                    logger.info("\n✅ Tous les clients ont été traités")
+                    break
+                clients, last_id = item
+
+                # Traiter le batch
+                batch_results = process_batch(
+                    batch_number=batch_number,
+                    clients=clients,
+                    mapper=mapper,
+                    batch_manager=batch_manager,
+                    cost_tracker=cost_tracker,
+                    mongo_saver=mongo_saver
+                )
+
+                # Pas de copie mémoire du détail par client sur tout le
+                # run: les totaux vivent dans cost_tracker.totals et le
+                # détail est persisté par save_batch_progress
+                # Déléguer résumé, progrès et checkpoint à l'étage writer
+                save_q.put((batch_number, batch_results, last_id))
+
+                # Préparer le prochain batch
+                batch_number += 1
+        finally:
+            save_q.put(None)
+            writer_thread.join()
+            cursor.close()
         
         # Résumé final
-        print_final_summary(all_batch_results, cost_tracker, batch_manager, mongo_saver)
+        print_final_summary(cost_tracker, batch_manager, mongo_saver)
         
         logger.info("\n" + "="*60)
         logger.info("✅ PHASE 1 TERMINÉE")
         logger.info("="*60 + "\n")
         
     except Exception as e:
-        logger.error(f"\n❌ ERREUR CRITIQUE: {str(e)}\n")
-        import traceback
-        logger.error(traceback.format_exc())
+        # logger.exception attache le traceback sans le formater à la main
+        logger.exception(f"\n❌ ERREUR CRITIQUE: {str(e)}\n")
 
 
 def print_batch_summary(batch_results: dict, cost_tracker: CostTracker):
-    """Afficher le résumé d'un batch"""
+    """Afficher le résumé d'un batch (une seule écriture stdout)"""
     batch_cost = cost_tracker.get_batch_cost()
     session_cost = cost_tracker.get_session_cost()
-    
-    print("\n" + "="*60)
-    print(f"📊 RÉSUMÉ BATCH #{batch_results['batch_number']}")
-    print("="*60)
-    print(f"✅ Succès: {batch_results['successful']}/{batch_results['total_clients']}")
-    print(f"⏭️  Skipped: {batch_results['skipped']}/{batch_results['total_clients']}")
-    print(f"❌ Échecs: {batch_results['failed']}/{batch_results['total_clients']}")
-    print(f"💰 Coût batch (RÉEL Apify): ${batch_cost:.4f}")
-    print(f"💰 Coût session: ${session_cost:.4f}/${cost_tracker.budget_limit}")
-    print(f"📈 Budget restant: ${cost_tracker.get_remaining_budget():.2f}")
-    print("="*60 + "\n")
-
-
-def print_final_summary(all_batches: list, cost_tracker: CostTracker, 
+
+    lines = [
+        "\n" + "="*60,
+        f"📊 RÉSUMÉ BATCH #{batch_results['batch_number']}",
+        "="*60,
+        f"✅ Succès: {batch_results['successful']}/{batch_results['total_clients']}",
+        f"⏭️  Skipped: {batch_results['skipped']}/{batch_results['total_clients']}",
+        f"❌ Échecs: {batch_results['failed']}/{batch_results['total_clients']}",
+        f"💰 Coût batch (RÉEL Apify): ${batch_cost:.4f}",
+        f"💰 Coût session: ${session_cost:.4f}/${cost_tracker.budget_limit}",
+        f"📈 Budget restant: ${cost_tracker.get_remaining_budget():.2f}",
+        "="*60 + "\n"
+    ]
+    # Un seul print: une acquisition du verrou stdout + un flush par batch
+    print('\n'.join(lines))
+
+
+def print_final_summary(cost_tracker: CostTracker,
                        batch_manager: BatchManager, mongo_saver: MongoMapperSaver):
-    """Afficher le résumé final"""
-    total_success = sum(b['successful'] for b in all_batches)
-    total_failed = sum(b['failed'] for b in all_batches)
-    total_skipped = sum(b['skipped'] for b in all_batches)
-    total_clients = sum(b['total_clients'] for b in all_batches)
-    
+    """Afficher le résumé final (totaux cumulés pendant le run)"""
+    totals = cost_tracker.totals
+    total_success = totals['successful']
+    total_failed = totals['failed']
+    total_skipped = totals['skipped']
+    total_clients = totals['total_clients']
+
     session_cost = cost_tracker.get_session_cost()
-    
-    print("\n" + "="*60)
-    print("📊 RÉSUMÉ FINAL - TOUS LES BATCHES")
-    print("="*60)
-    print(f"📦 Nombre de batches traités: {len(all_batches)}")
-    print(f"👥 Total clients: {total_clients}")
-    print(f"✅ Succès: {total_success} ({total_success/total_clients*100:.1f}%)")
-    print(f"⏭️  Skipped: {total_skipped} ({total_skipped/total_clients*100:.1f}%)")
-    print(f"❌ Échecs: {total_failed} ({total_failed/total_clients*100:.1f}%)")
-    print(f"\n💰 COÛTS APIFY RÉELS:")
-    print(f"   Session: ${session_cost:.4f}")
-    print(f"   Moyen/client: ${session_cost/total_success:.4f}" if total_success > 0 else "N/A")
-    print("="*60)
-    
+
+    lines = [
+        "\n" + "="*60,
+        "📊 RÉSUMÉ FINAL - TOUS LES BATCHES",
+        "="*60,
+        f"📦 Nombre de batches traités: {totals['batches']}",
+        f"👥 Total clients: {total_clients}",
+        f"✅ Succès: {total_success} ({total_success/total_clients*100:.1f}%)",
+        f"⏭️  Skipped: {total_skipped} ({total_skipped/total_clients*100:.1f}%)",
+        f"❌ Échecs: {total_failed} ({total_failed/total_clients*100:.1f}%)",
+        "\n💰 COÛTS APIFY RÉELS:",
+        f"   Session: ${session_cost:.4f}",
+        f"   Moyen/client: ${session_cost/total_success:.4f}" if total_success > 0 else "N/A",
+        "="*60
+    ]
+
     # Statistiques MongoDB
     mongo_stats = mongo_saver.get_statistics()
-    print(f"\n📊 MONGODB (ads_metrics):")
-    print(f"   Total documents: {mongo_stats.get('total_clients', 0)}")
+    lines.append(f"\n📊 MONGODB (ads_metrics):")
+    lines.append(f"   Total documents: {mongo_stats.get('total_clients', 0)}")
     if mongo_stats.get('by_status'):
         for status, data in mongo_stats['by_status'].items():
-            print(f"   • {status}: {data['count']} ({data.get('total_ads', 0)} ads)")
-    
+            lines.append(f"   • {status}: {data['count']} ({data.get('total_ads', 0)} ads)")
+
     # Afficher les clients échoués
     failed_clients = batch_manager.get_failed_clients()
     if failed_clients:
-        print(f"\n⚠️ {len(failed_clients)} client(s) en échec:")
+        lines.append(f"\n⚠️ {len(failed_clients)} client(s) en échec:")
         for client in failed_clients[:10]:
-            print(f"  • {client['client_id']}: {client['error'][:50]}...")
+            lines.append(f"  • {client['client_id']}: {client['error'][:50]}...")
         if len(failed_clients) > 10:
-            print(f"  ... et {len(failed_clients) - 10} autres")
-    
-    print("\n💾 Données sauvegardées:")
-    print(f"  • MongoDB: converty.ads_metrics")
-    print(f"  • Progrès: data/output/batch_progress.json")
-    print(f"  • Coûts: data/output/cost_tracking.json")
-    print("="*60 + "\n")
+            lines.append(f"  ... et {len(failed_clients) - 10} autres")
+
+    lines.append("\n💾 Données sauvegardées:")
+    lines.append("  • MongoDB: converty.ads_metrics")
+    lines.append("  • Progrès: data/output/batch_progress.json")
+    lines.append("  • Coûts: data/output/cost_tracking.json")
+    lines.append("="*60 + "\n")
+
+    # Un seul print pour tout le résumé final
+    print('\n'.join(lines))
 
 
 if __name__ == "__main__":
@@ -1,16 +1,89 @@
 """
 Point d'entrée Phase 2: Classification CONVERTY vs CONCURRENT
 """
-import json
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from src.classification.ad_analyzer import AdAnalyzer
 from src.reporting.stats_generator import StatsGenerator
-from src.database.mongo_client import MongoDBClient
+from src.database.mongo_client import get_mongo_client
+from src.utils.domains import normalize_domain
 from src.utils.logger import setup_logger
 from config.settings import settings
 
 logger = setup_logger(__name__)
 
+# Clients analysés en parallèle: le travail par client est dominé par
+# l'I/O réseau (Apify, DNS, MongoDB), pas le CPU
+MAX_WORKERS = 4
+
+# Un AdAnalyzer par thread worker (pas d'état partagé entre clients)
+_thread_local = threading.local()
+
+
+def _get_analyzer() -> AdAnalyzer:
+    """Récupérer l'analyseur propre au thread courant (créé à la demande)"""
+    analyzer = getattr(_thread_local, 'analyzer', None)
+    if analyzer is None:
+        analyzer = AdAnalyzer()
+        _thread_local.analyzer = analyzer
+    return analyzer
+
+
+def _process_one(src: dict, stats_gen: StatsGenerator, mongo_client) -> tuple:
+    """
+    Analyser un client depuis son document mapping (exécuté dans le pool)
+
+    Returns:
+        (client_label, 'ok' | 'skipped' | 'error')
+    """
+    client_label = src.get('client_id') or str(src.get('_id'))
+
+    try:
+        mapping_data = src
+
+        # Normaliser la clé des mappings (Phase 1 peut stocker 'sites_mapping')
+        if not mapping_data.get('mappings') and mapping_data.get('sites_mapping'):
+            mapping_data['mappings'] = mapping_data['sites_mapping']
+
+        # Fallback sur total_ads depuis processing_metadata si absent
+        if 'total_ads' not in mapping_data and mapping_data.get('processing_metadata'):
+            mapping_data['total_ads'] = mapping_data['processing_metadata'].get('total_ads', 0)
+
+        # Vérifier la présence finale de 'mappings'
+        if not mapping_data.get('mappings'):
+            logger.warning(f"⏭️ Skip {client_label}: champ 'mappings' absent")
+            return client_label, 'skipped'
+
+        # Analyser le client (analyseur local au thread)
+        report = _get_analyzer().analyze_client(mapping_data)
+
+        # Sauvegarder JSON local
+        stats_gen.save_classification_report(report)
+
+        # Sauvegarder dans MongoDB (report détaillé)
+        client_slug = report['client_id']
+        domain = normalize_domain(mapping_data['mappings'][0].get('site'))
+
+        mongo_id = mongo_client.save_ad_metrics(
+            client_slug=client_slug,
+            domain=domain,
+            report=report
+        )
+
+        if mongo_id:
+            logger.info(f"💾 Métriques sauvegardées dans MongoDB (ID: {mongo_id})")
+
+        # Afficher le résumé
+        stats_gen.print_summary(report)
+
+        return client_label, 'ok'
+
+    except Exception as e:
+        # logger.exception attache le traceback sans le formater à la main
+        logger.exception(f"❌ Erreur lors du traitement de {client_label}: {str(e)}")
+        return client_label, 'error'
+
 
 def main():
     """Fonction principale Phase 2"""
@@ -23,12 +96,6 @@ def main():
         help='ID du client à analyser (ex: ravino). Si non spécifié, analyse tous les clients.',
         default=None
     )
-    parser.add_argument(
-        '--no-db',
-        action='store_true',
-        help='Ne pas sauvegarder dans MongoDB (seulement JSON)',
-        default=False
-    )
     args = parser.parse_args()
     
     logger.info("\n" + "="*60)
@@ -36,14 +103,10 @@ def main():
     logger.info("="*60 + "\n")
     
     # Connexion MongoDB (obligatoire)
-    mongo_client = None
-    if not args.no_db:
-        try:
-            mongo_client = MongoDBClient()
-        except Exception as e:
-            logger.warning(f"⚠️ MongoDB non disponible, sauvegarde JSON uniquement: {e}")
-    if args.no_db or not mongo_client:
-        logger.error("MongoDB requis pour Phase 2 (pas de fallback fichiers)")
+    try:
+        mongo_client = get_mongo_client()
+    except Exception as e:
+        logger.error(f"MongoDB requis pour Phase 2 (pas de fallback fichiers): {e}")
         return
     
     try:
@@ -60,76 +123,59 @@ def main():
         else:
             logger.info("🟢 Chargement des clients ACTIFS uniquement (status='active')\n")
 
-        cursor = mongo_client.db['ads_metrics'].find(query).sort('timestamp', -1)
-        mapping_documents = list(cursor)
-        logger.info(f"Docs actifs type='mapping' trouvés: {len(mapping_documents)}")
-        if not mapping_documents:
+        # Projection: seuls les champs lus par l'analyse sont rapatriés —
+        # les documents mapping embarquent des payloads d'ads volumineux
+        projection = {
+            'client_id': 1,
+            'mappings': 1,
+            'sites_mapping': 1,
+            'processing_metadata': 1,
+            'is_active': 1,
+            'phase2_recommendation': 1,
+            'total_ads': 1,
+            'timestamp': 1
+        }
+        # Streamer le curseur au lieu de matérialiser tous les documents
+        # (chaque mapping peut peser plusieurs Mo): mémoire en O(batch)
+        # au lieu de O(clients), le total vient d'un count_documents
+        total = mongo_client.db['ads_metrics'].count_documents(query)
+        logger.info(f"Docs actifs type='mapping' trouvés: {total}")
+        if not total:
             logger.error("❌ Aucun document actif de type 'mapping' pour ce filtre")
             logger.error(f"Requête: {query}")
             return
-        logger.info(f"✓ {len(mapping_documents)} document(s) prêt(s) à traiter")
+        logger.info(f"✓ {total} document(s) prêt(s) à traiter")
+
+        cursor = mongo_client.db['ads_metrics'].find(query, projection) \
+            .sort('timestamp', -1).batch_size(10)
 
         print()  # Ligne vide
-        
-        # Créer l'analyseur et le générateur de stats
-        analyzer = AdAnalyzer()
+
+        # Créer le générateur de stats (les analyseurs sont par thread)
         stats_gen = StatsGenerator()
-        
-        # Analyser chaque client (MongoDB uniquement)
-        source_list = mapping_documents
-
-        for i, src in enumerate(source_list, 1):
-            client_label = src.get('client_id') or str(src.get('_id'))
-            logger.info(f"\n{'='*60}")
-            logger.info(f"📂 [{i}/{len(source_list)}] Traitement depuis DB: {client_label}")
-            logger.info(f"{'='*60}")
-
-            try:
-                # Charger le mapping Phase 1 depuis MongoDB
-                mapping_data = src
-
-                # Normaliser la clé des mappings (Phase 1 peut stocker 'sites_mapping')
-                if not mapping_data.get('mappings') and mapping_data.get('sites_mapping'):
-                    mapping_data['mappings'] = mapping_data['sites_mapping']
-
-                # Fallback sur total_ads depuis processing_metadata si absent
-                if 'total_ads' not in mapping_data and mapping_data.get('processing_metadata'):
-                    mapping_data['total_ads'] = mapping_data['processing_metadata'].get('total_ads', 0)
-
-                # Vérifier la présence finale de 'mappings'
-                if not mapping_data.get('mappings'):
-                    logger.warning(f"⏭️ Skip {client_label}: champ 'mappings' absent")
-                    continue
-
-                # Analyser le client
-                report = analyzer.analyze_client(mapping_data)
-
-                # Sauvegarder JSON local
-                output_file = stats_gen.save_classification_report(report)
-
-                # Sauvegarder dans MongoDB (report détaillé)
-                if mongo_client and mapping_data.get('mappings'):
-                    client_slug = report['client_id']
-                    domain = mapping_data['mappings'][0].get('site')
-
-                    mongo_id = mongo_client.save_ad_metrics(
-                        client_slug=client_slug,
-                        domain=domain,
-                        report=report
-                    )
-
-                    if mongo_id:
-                        logger.info(f"💾 Métriques sauvegardées dans MongoDB (ID: {mongo_id})")
-
-                # Afficher le résumé
-                stats_gen.print_summary(report)
-
-            except Exception as e:
-                src_name = src if not mapping_documents else (src.get('client_id') or str(src.get('_id')))
-                logger.error(f"❌ Erreur lors du traitement de {src_name}: {str(e)}")
-                import traceback
-                logger.error(traceback.format_exc())
-                continue
+
+        # Analyser les clients en parallèle, avec soumission bornée:
+        # au plus 2×MAX_WORKERS documents mapping en vol pour garder la
+        # mémoire en O(workers) malgré des documents de plusieurs Mo
+        done_count = 0
+
+        def _log_done(future):
+            nonlocal done_count
+            done_count += 1
+            client_label, status = future.result()
+            logger.info(f"📂 [{done_count}/{total}] Terminé: {client_label} ({status})")
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            in_flight = set()
+            for src in cursor:
+                in_flight.add(executor.submit(_process_one, src, stats_gen, mongo_client))
+                if len(in_flight) >= MAX_WORKERS * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _log_done(future)
+
+            for future in as_completed(in_flight):
+                _log_done(future)
         
         logger.info("\n" + "="*60)
         logger.info("✅ PHASE 2 TERMINÉE AVEC SUCCÈS")
@@ -142,9 +188,7 @@ def main():
         print_cache_stats()
         
     except Exception as e:
-        logger.error(f"\n❌ ERREUR GLOBALE: {str(e)}\n")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception(f"\n❌ ERREUR GLOBALE: {str(e)}\n")
     
     finally:
         # 🆕 Fermer la connexion MongoDB
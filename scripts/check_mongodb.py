@@ -2,18 +2,46 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.database.mongo_client import MongoDBClient
-import json
-from bson import json_util
+from src.database.mongo_client import get_mongo_client
+from bson.json_util import dumps as bson_dumps
+from pymongo import DESCENDING
+
+# Projection en inclusion: seuls les champs résumés réellement affichés
+# transitent (les tableaux mappings/page_details peuvent peser des Mo)
+PROJECTION = {
+    '_id': 1,
+    'client_id': 1,
+    'client_slug': 1,
+    'domain': 1,
+    'type': 1,
+    'status': 1,
+    'processing_status': 1,
+    'total_ads': 1,
+    'total_sites': 1,
+    'metrics': 1,
+    'created_at': 1,
+    'timestamp': 1,
+    'analyzed_at': 1,
+}
 
 if __name__ == '__main__':
     try:
-        c = MongoDBClient()
-        docs = list(c.db['ads_metrics'].find().sort('created_at', -1).limit(10))
+        c = get_mongo_client()
+        # hint: parcours borné de l'index created_at desc (pas de tri mémoire)
+        docs = list(
+            c.db['ads_metrics']
+            .find({}, PROJECTION)
+            .sort('created_at', -1)
+            .limit(10)
+            .batch_size(10)
+            .hint([('created_at', DESCENDING)])
+        )
         if not docs:
             print('No documents found in converty.ads_metrics')
-        for d in docs:
-            print(json.dumps(d, default=json_util.default, indent=2))
+        else:
+            # bson_dumps encode les types BSON sans callback default par
+            # objet; une seule écriture stdout pour tous les documents
+            sys.stdout.write('\n'.join(bson_dumps(d, indent=2) for d in docs) + '\n')
     except Exception as e:
         print('ERROR:', e)
         import traceback
@@ -0,0 +1,63 @@
+"""
+Insérer deux documents de test (mapping + report) dans ads_metrics
+
+Permet de développer le dashboard sans lancer les phases. Les deux
+documents partent en un seul insert_many (un aller-retour réseau;
+ordered=False laisse le serveur pipeliner les écritures).
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+from src.database.mongo_client import get_mongo_client
+
+if __name__ == '__main__':
+    # Datetime BSON natif, comme les écrivains des phases (save_mapping,
+    # save_ad_metrics): des chaînes ISO tomberaient dans un autre type
+    # bracket BSON et casseraient les filtres $gt du chargement
+    # incrémental du dashboard
+    now = datetime.now()
+
+    mapping = {
+        'client_id': 'test-client',
+        'type': 'mapping',
+        'status': 'active',
+        'processing_status': 'completed',
+        'total_ads': 12,
+        'is_active': True,
+        'mappings': [{
+            'site': 'test-client.converty.shop',
+            'total_ads': 12,
+            'fb_pages': [{'page_id': '123', 'page_name': 'Test Page',
+                          'ads_count': 12, 'confidence': 'high'}],
+            'mapped_at': now
+        }],
+        'timestamp': now,
+        'created_at': now
+    }
+
+    report = {
+        'client_id': 'test-client',
+        'client_slug': 'test-client',
+        'type': 'report',
+        'domain': 'test-client.converty.shop',
+        'analyzed_at': now,
+        'timestamp': now,
+        'metrics': {
+            'total_ads': 12,
+            'converty_ads': 9,
+            'concurrent_ads': 2,
+            'unknown_ads': 1,
+            'converty_ratio': 75.0,
+            'concurrent_ratio': 16.67
+        },
+        'top_competitors': [
+            {'domain': 'concurrent.example', 'total_ads': 2, 'platform': 'shopify'}
+        ]
+    }
+
+    c = get_mongo_client()
+    result = c.db['ads_metrics'].insert_many([mapping, report], ordered=False)
+    print(f"✅ Mapping inséré: {result.inserted_ids[0]}")
+    print(f"✅ Report inséré: {result.inserted_ids[1]}")
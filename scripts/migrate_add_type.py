@@ -0,0 +1,116 @@
+"""
+Migration: backfill du champ 'type' sur les documents ads_metrics
+
+Les anciens runs écrivaient des documents sans 'type'; le dashboard et
+la Phase 2 filtrent dessus. La classification est une pure présence de
+clés: elle s'exécute entièrement côté serveur via un pipeline
+d'agrégation ($switch) terminé par $merge dans la même collection —
+aucun document ne transite vers le client, aucune boucle Python.
+
+Usage:
+    python scripts/migrate_add_type.py            # Appliquer
+    python scripts/migrate_add_type.py --dry-run  # Compter sans écrire
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+from src.database.mongo_client import get_mongo_client
+
+# Classification serveur: mapping (Phase 1) si tableau de mappings,
+# report (Phase 2) si métriques/pages FB/analyzed_at présents
+_TYPE_SWITCH = {
+    '$switch': {
+        'branches': [
+            {
+                'case': {'$or': [
+                    {'$isArray': '$mappings'},
+                    {'$isArray': '$sites_mapping'}
+                ]},
+                'then': 'mapping'
+            },
+            {
+                'case': {'$or': [
+                    {'$ne': ['$metrics', None]},
+                    {'$ne': ['$facebook_pages', None]},
+                    {'$ne': ['$analyzed_at', None]}
+                ]},
+                'then': 'report'
+            },
+        ],
+        'default': 'unknown'
+    }
+}
+
+_MATCH_MISSING_TYPE = {'$match': {'type': {'$exists': False}}}
+
+
+def count_by_type(coll) -> dict:
+    """
+    Compter côté serveur les documents sans 'type' par type détecté
+
+    Returns:
+        {'mapping': n, 'report': n, 'unknown': n}
+    """
+    pipeline = [
+        _MATCH_MISSING_TYPE,
+        {'$addFields': {'type': _TYPE_SWITCH}},
+        {'$group': {'_id': '$type', 'count': {'$sum': 1}}}
+    ]
+    counts = {'mapping': 0, 'report': 0, 'unknown': 0}
+    for row in coll.aggregate(pipeline):
+        counts[row['_id']] = row['count']
+    return counts
+
+
+def migrate(dry_run: bool = False) -> int:
+    """
+    Backfiller 'type' sur tous les documents qui ne l'ont pas
+
+    Args:
+        dry_run: True = compter par type sans écrire
+
+    Returns:
+        Nombre de documents mis à jour
+    """
+    coll = get_mongo_client().db['ads_metrics']
+
+    counts = count_by_type(coll)
+    updated = 0
+
+    if not dry_run:
+        # $merge écrit le champ calculé directement côté serveur:
+        # coût proportionnel au scan serveur, mémoire client nulle
+        coll.aggregate([
+            _MATCH_MISSING_TYPE,
+            {'$addFields': {'type': _TYPE_SWITCH}},
+            {'$merge': {
+                'into': 'ads_metrics',
+                'on': '_id',
+                'whenMatched': 'merge',
+                'whenNotMatched': 'discard'
+            }}
+        ])
+        updated = sum(counts.values())
+
+    print("\n" + "="*60)
+    print("📊 MIGRATION 'type' - ads_metrics")
+    print("="*60)
+    for doc_type, count in counts.items():
+        print(f"   • {doc_type}: {count} document(s)")
+    if dry_run:
+        print("   (dry-run: aucune écriture)")
+    else:
+        print(f"✅ {updated} document(s) mis à jour")
+    print("="*60 + "\n")
+
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill du champ 'type' sur ads_metrics")
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Compter les documents par type sans écrire')
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -1,27 +1,93 @@
 """
 Script rapide pour afficher un résumé des coûts en temps réel
+
+Lit le résumé compact (cost_tracking_summary.json) et la queue du
+journal append-only (cost_tracking.jsonl): coût de lecture O(1) quel
+que soit l'historique, au lieu de re-parser tout cost_tracking.json.
 Usage: python scripts/quick_cost_check.py
 """
 import json
+import os
 from pathlib import Path
 
-def main():
+# orjson (parse C, 3-5x plus rapide) avec repli stdlib
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _loads(raw: bytes):
+    """Parser un blob JSON (orjson si disponible)"""
+    if HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _tail_batches(jsonl_file: Path, max_lines: int = 3, tail_bytes: int = 8192):
+    """
+    Lire les derniers événements de batch sans parcourir le fichier
+
+    Seek en fin de fichier puis parse des dernières lignes: lecture
+    bornée à tail_bytes même avec des milliers de batches.
+    """
+    if not jsonl_file.exists():
+        return []
+
+    with open(jsonl_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - tail_bytes))
+        chunk = f.read()
+
+    lines = chunk.splitlines()
+    if size > tail_bytes and lines:
+        lines = lines[1:]  # Première ligne potentiellement tronquée par le seek
+
+    batches = []
+    for raw in lines[-max_lines:]:
+        try:
+            batches.append(_loads(raw))
+        except ValueError:
+            continue
+    return batches
+
+
+def _load_summary():
+    """
+    Charger le résumé compact, avec repli sur l'ancien cost_tracking.json
+    """
+    summary_file = Path("data/output/cost_tracking_summary.json")
+    if summary_file.exists():
+        return _loads(summary_file.read_bytes())
+
+    # Repli: anciens runs sans résumé compact
     cost_file = Path("data/output/cost_tracking.json")
-    
     if not cost_file.exists():
+        return None
+    data = _loads(cost_file.read_bytes())
+    return {
+        'session_cost': data.get('session_cost', 0),
+        'budget_limit': data.get('budget_limit', 5.0),
+        'clients_count': len(data.get('clients', {})),
+        'batches_count': len(data.get('batches', [])),
+    }
+
+
+def main():
+    summary = _load_summary()
+
+    if summary is None:
         print("❌ Aucun fichier de coûts trouvé. Lancez d'abord phase1_main.py")
         return
-    
-    with open(cost_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    session_cost = data.get('session_cost', 0)
-    budget = data.get('budget_limit', 5.0)
+
+    session_cost = summary.get('session_cost', 0)
+    budget = summary.get('budget_limit', 5.0)
     percentage = (session_cost / budget * 100) if budget > 0 else 0
     remaining = budget - session_cost
-    clients = len(data.get('clients', {}))
-    batches = len(data.get('batches', []))
-    
+    clients = summary.get('clients_count', 0)
+    batches = summary.get('batches_count', 0)
+
     # Icône selon le niveau
     if percentage >= 90:
         icon = "🔴"
@@ -31,32 +97,31 @@ def main():
         icon = "🟡"
     else:
         icon = "🟢"
-    
-    # Estimation
+
+    # Estimation basée sur les 3 derniers batches (queue du journal)
     estimated = None
-    if batches > 0:
-        recent = data['batches'][-3:]
-        avg_costs = [b['avg_cost_per_client'] for b in recent if b.get('clients_count', 0) > 0]
-        if avg_costs:
-            avg = sum(avg_costs) / len(avg_costs)
-            estimated = int(remaining / avg) if avg > 0 else 0
-    
+    recent = _tail_batches(Path("data/output/cost_tracking.jsonl"))
+    avg_costs = [b['avg_cost_per_client'] for b in recent if b.get('clients_count', 0) > 0]
+    if avg_costs:
+        avg = sum(avg_costs) / len(avg_costs)
+        estimated = int(remaining / avg) if avg > 0 else 0
+
     # Affichage compact
     print(f"\n{icon} Budget: ${session_cost:.4f}/${budget:.2f} ({percentage:.1f}%) | "
           f"Restant: ${remaining:.4f} | "
           f"Clients: {clients} | "
           f"Batches: {batches}", end="")
-    
+
     if estimated:
         print(f" | Estimation: ~{estimated} clients restants")
     else:
         print()
-    
+
     # Moyenne
     if clients > 0:
         avg = session_cost / clients
         print(f"📊 Coût moyen: ${avg:.4f}/client")
-    
+
     print()
 
 if __name__ == "__main__":
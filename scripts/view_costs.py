@@ -7,17 +7,26 @@ from pathlib import Path
 from datetime import datetime
 from colorama import init, Fore, Style
 
+# orjson (parse C, 3-5x plus rapide) avec repli stdlib
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Initialiser colorama pour Windows
 init()
 
 def load_cost_tracking():
     """Charger le fichier de tracking des coûts"""
     file_path = Path("data/output/cost_tracking.json")
-    
+
     if not file_path.exists():
         print(f"{Fore.RED}❌ Fichier de tracking non trouvé: {file_path}{Style.RESET_ALL}")
         return None
-    
+
+    if HAS_ORJSON:
+        return orjson.loads(file_path.read_bytes())
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
@@ -73,18 +82,22 @@ def display_cost_dashboard(data):
     print(f"   Complétés: {len(batches)}")
     
     if batches:
-        print(f"\n{Fore.CYAN}📈 HISTORIQUE DES BATCHES:{Style.RESET_ALL}")
-        print(f"   {'Batch':<10} {'Coût':<12} {'Clients':<10} {'$/Client':<12} {'Total Session':<15}")
-        print(f"   {'-'*60}")
-        
-        for batch in batches:
-            batch_num = batch.get('batch_number', '?')
-            cost = batch.get('cost', 0)
-            clients = batch.get('clients_count', 0)
-            avg = batch.get('avg_cost_per_client', 0)
-            total = batch.get('session_total', 0)
-            
-            print(f"   #{batch_num:<9} ${cost:<11.4f} {clients:<10} ${avg:<11.4f} ${total:<14.4f}")
+        # Table construite en mémoire puis émise en une seule écriture:
+        # un write() + un passage colorama au lieu d'un par ligne de batch
+        lines = [
+            f"\n{Fore.CYAN}📈 HISTORIQUE DES BATCHES:{Style.RESET_ALL}",
+            f"   {'Batch':<10} {'Coût':<12} {'Clients':<10} {'$/Client':<12} {'Total Session':<15}",
+            f"   {'-'*60}",
+        ]
+        lines.extend(
+            f"   #{batch.get('batch_number', '?'):<9} "
+            f"${batch.get('cost', 0):<11.4f} "
+            f"{batch.get('clients_count', 0):<10} "
+            f"${batch.get('avg_cost_per_client', 0):<11.4f} "
+            f"${batch.get('session_total', 0):<14.4f}"
+            for batch in batches
+        )
+        sys.stdout.write('\n'.join(lines) + '\n')
     
     # Estimation
     if batches:
@@ -1,24 +1,80 @@
 """
 Charts - Générateur de graphiques pour le dashboard
 """
+import functools
+import types
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from typing import Dict, List, Any
 import pandas as pd
 
+# Palette partagée, immuable (clés déjà en minuscules): résolue une
+# seule fois au niveau module au lieu d'un attribut d'instance par appel
+_COLORS = types.MappingProxyType({
+    'converty': '#10b981',      # Vert
+    'concurrent': '#ef4444',    # Rouge
+    'active': '#22c55e',        # Vert clair
+    'inactive': '#6b7280',      # Gris
+    'neutral': '#3b82f6'        # Bleu
+})
+
+
+def _freeze(value):
+    """Convertir récursivement listes/dicts en tuples hashables"""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _memoize_figure(method):
+    """
+    Mémoïser une figure par signature d'entrées, sérialisée en JSON
+
+    La construction d'une go.Figure passe par les validateurs Plotly
+    (coûteux); sur un dashboard qui re-rend les mêmes données, un hit
+    se réduit à un from_json. Les entrées non hashables (DataFrames)
+    court-circuitent le cache.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            key = (method.__name__, _freeze(args), _freeze(sorted(kwargs.items())))
+            cached = self._fig_json_cache.get(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+
+        if cached is not None:
+            return pio.from_json(cached)
+
+        fig = method(self, *args, **kwargs)
+        self._fig_json_cache[key] = fig.to_json()
+        # Éviction FIFO simple pour borner la mémoire
+        if len(self._fig_json_cache) > ChartGenerator.FIG_CACHE_MAXSIZE:
+            self._fig_json_cache.pop(next(iter(self._fig_json_cache)))
+        return fig
+    return wrapper
+
 
 class ChartGenerator:
     """Génère tous les graphiques du dashboard"""
-    
-    # Palette de couleurs
-    COLORS = {
-        'converty': '#10b981',      # Vert
-        'concurrent': '#ef4444',    # Rouge
-        'active': '#22c55e',        # Vert clair
-        'inactive': '#6b7280',      # Gris
-        'neutral': '#3b82f6'        # Bleu
-    }
-    
+
+    # Pas de __dict__ par instance: seul le cache de figures est porté
+    __slots__ = ('_fig_json_cache',)
+
+    # Palette de couleurs (alias de la table module immuable)
+    COLORS = _COLORS
+
+    # Figures mémoïsées (JSON sérialisé) conservées au maximum
+    FIG_CACHE_MAXSIZE = 256
+
+    def __init__(self):
+        self._fig_json_cache = {}
+
+    @_memoize_figure
     def create_progress_gauge(self, progression: float, label: str = "Progression") -> go.Figure:
         """
         Jauge de progression circulaire
@@ -51,6 +107,7 @@ class ChartGenerator:
         fig.update_layout(height=300, margin=dict(l=20, r=20, t=60, b=20))
         return fig
     
+    @_memoize_figure
     def create_time_series(self, dates: List, values_dict: Dict[str, List]) -> go.Figure:
         """
         Graphique en ligne temporel
@@ -59,30 +116,36 @@ class ChartGenerator:
             dates: Liste de dates
             values_dict: {'label': [values], ...}
         """
-        fig = go.Figure()
-        
-        for label, values in values_dict.items():
-            color = self.COLORS.get(label.lower(), self.COLORS['neutral'])
-            fig.add_trace(go.Scatter(
+        # Toutes les traces en un seul passage dans le constructeur:
+        # une validation Plotly au lieu d'une par add_trace.
+        # Liaisons locales de la palette (pas de lookup attribut par série)
+        get_color = _COLORS.get
+        default_color = _COLORS['neutral']
+        traces = [
+            go.Scatter(
                 x=dates,
                 y=values,
                 mode='lines+markers',
                 name=label,
-                line=dict(color=color, width=3),
+                line=dict(color=get_color(label.lower(), default_color), width=3),
                 marker=dict(size=8)
-            ))
-        
-        fig.update_layout(
-            title="Évolution temporelle",
-            xaxis_title="Date",
-            yaxis_title="Nombre",
-            hovermode='x unified',
-            template='plotly_white',
-            height=400
+            )
+            for label, values in values_dict.items()
+        ]
+
+        return go.Figure(
+            data=traces,
+            layout=go.Layout(
+                title="Évolution temporelle",
+                xaxis_title="Date",
+                yaxis_title="Nombre",
+                hovermode='x unified',
+                template='plotly_white',
+                height=400
+            )
         )
-        
-        return fig
     
+    @_memoize_figure
     def create_area_chart(self, dates: List, values: List, label: str) -> go.Figure:
         """
         Graphique en aire (rempli)
@@ -113,6 +176,7 @@ class ChartGenerator:
         
         return fig
     
+    @_memoize_figure
     def create_pie_chart(self, labels: List[str], values: List[int], title: str) -> go.Figure:
         """
         Graphique camembert
@@ -141,6 +205,7 @@ class ChartGenerator:
         
         return fig
     
+    @_memoize_figure
     def create_bar_chart(self, labels: List[str], values: List[int], 
                         title: str, horizontal: bool = False) -> go.Figure:
         """
@@ -176,6 +241,7 @@ class ChartGenerator:
         
         return fig
     
+    @_memoize_figure
     def create_stacked_bar(self, categories: List[str], 
                           data_dict: Dict[str, List[int]], title: str) -> go.Figure:
         """
@@ -186,27 +252,29 @@ class ChartGenerator:
             data_dict: {'label': [values], ...}
             title: Titre
         """
-        fig = go.Figure()
-        
         colors = [self.COLORS['converty'], self.COLORS['concurrent']]
-        for i, (label, values) in enumerate(data_dict.items()):
-            fig.add_trace(go.Bar(
+        # Liste de traces construite d'un coup (une seule validation)
+        traces = [
+            go.Bar(
                 name=label,
                 x=categories,
                 y=values,
                 marker=dict(color=colors[i % len(colors)])
-            ))
-        
-        fig.update_layout(
-            barmode='stack',
-            title=title,
-            xaxis_title="",
-            yaxis_title="Nombre",
-            template='plotly_white',
-            height=400
+            )
+            for i, (label, values) in enumerate(data_dict.items())
+        ]
+
+        return go.Figure(
+            data=traces,
+            layout=go.Layout(
+                barmode='stack',
+                title=title,
+                xaxis_title="",
+                yaxis_title="Nombre",
+                template='plotly_white',
+                height=400
+            )
         )
-        
-        return fig
     
     def create_sunburst(self, data_df: pd.DataFrame, 
                        path: List[str], values: str, title: str) -> go.Figure:
@@ -219,17 +287,49 @@ class ChartGenerator:
             values: Colonne des valeurs
             title: Titre
         """
-        fig = px.sunburst(
-            data_df,
-            path=path,
-            values=values,
-            title=title,
-            color_discrete_sequence=px.colors.qualitative.Pastel
+        # Aplatir la hiérarchie en un seul passage itertuples puis
+        # déléguer au chemin go.Sunburst direct (pas de re-wrap pandas
+        # ni de validateurs plotly-express)
+        node_totals = {}
+        for row in data_df[path + [values]].itertuples(index=False):
+            *levels, value = row
+            for depth in range(1, len(levels) + 1):
+                key = tuple(levels[:depth])
+                node_totals[key] = node_totals.get(key, 0) + value
+
+        ids = [' / '.join(key) for key in node_totals]
+        labels = [key[-1] for key in node_totals]
+        parents = [' / '.join(key[:-1]) for key in node_totals]
+        flat_values = list(node_totals.values())
+
+        return self.create_sunburst_flat(labels, parents, flat_values, title, ids=ids)
+
+    @_memoize_figure
+    def create_sunburst_flat(self, labels: List[str], parents: List[str],
+                             values: List, title: str, ids: List[str] = None) -> go.Figure:
+        """
+        Sunburst depuis des tableaux plats (sans DataFrame)
+
+        Args:
+            labels: Libellés des nœuds
+            parents: Parent de chaque nœud ('' pour les racines)
+            values: Valeur totale de chaque nœud (branchvalues='total')
+            title: Titre
+            ids: Identifiants uniques optionnels (libellés dupliqués)
+        """
+        return go.Figure(
+            data=[go.Sunburst(
+                ids=ids,
+                labels=labels,
+                parents=parents,
+                values=values,
+                branchvalues='total',
+                marker=dict(colors=px.colors.qualitative.Pastel)
+            )],
+            layout=go.Layout(title=title, height=500)
         )
-        
-        fig.update_layout(height=500)
-        return fig
     
+    @_memoize_figure
     def create_histogram(self, values: List[int], bins: int, 
                         title: str, color: str = 'neutral') -> go.Figure:
         """
@@ -241,18 +341,24 @@ class ChartGenerator:
             title: Titre
             color: Clé couleur
         """
-        fig = go.Figure(go.Histogram(
-            x=values,
-            nbinsx=bins,
-            marker=dict(color=self.COLORS[color])
-        ))
-        
-        fig.update_layout(
-            title=title,
-            xaxis_title="Valeur",
-            yaxis_title="Fréquence",
-            template='plotly_white',
-            height=400
+        # Binning vectorisé côté serveur: le navigateur reçoit O(bins)
+        # barres au lieu de la liste brute O(N) que go.Histogram
+        # re-binnerait lui-même
+        counts, edges = np.histogram(np.asarray(values, dtype=np.float64), bins=bins)
+        centers = 0.5 * (edges[:-1] + edges[1:])
+
+        return go.Figure(
+            data=[go.Bar(
+                x=centers,
+                y=counts,
+                marker=dict(color=self.COLORS[color])
+            )],
+            layout=go.Layout(
+                title=title,
+                xaxis_title="Valeur",
+                yaxis_title="Fréquence",
+                bargap=0,
+                template='plotly_white',
+                height=400
+            )
         )
-        
-        return fig
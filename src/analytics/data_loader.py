@@ -1,70 +1,392 @@
 """
 DataLoader - Charge les données depuis MongoDB pour le dashboard
 """
-from typing import Dict, List, Any
-from datetime import datetime
-from src.database.mongo_client import MongoDBClient
+import re
+from typing import Dict, List, Any, Set
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from src.database.mongo_client import get_mongo_client
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Champs date pouvant arriver sous forme ExtendedJSON {'$date': ...}
+# (documents importés depuis des fichiers JSON)
+_DATE_FIELDS = ('timestamp', 'analyzed_at')
+
+# Projections par type de document: seuls les champs lus par le
+# dashboard et MetricsCalculator transitent (les tableaux page_details /
+# mappings.fb_pages pèsent l'essentiel des octets BSON)
+_MAPPING_PROJECTION = {
+    '_id': 0,
+    'client_id': 1,
+    'type': 1,
+    'status': 1,
+    'timestamp': 1,
+    'created_at': 1,
+    'total_ads': 1,
+    'processing_metadata.total_ads': 1,
+}
+_REPORT_PROJECTION = {
+    '_id': 0,
+    'client_id': 1,
+    'client_slug': 1,
+    'type': 1,
+    'status': 1,
+    'analyzed_at': 1,
+    'timestamp': 1,
+    'metrics': 1,
+    'competitors': 1,
+    'top_competitors': 1,
+}
+# Union des deux (le chargement incrémental mélange les types);
+# _id conservé: le cache incrémental du dashboard indexe dessus
+_INCREMENTAL_PROJECTION = {**_MAPPING_PROJECTION, **_REPORT_PROJECTION, '_id': 1}
+# Champs nécessaires à l'historique d'exécutions d'un client
+_HISTORY_PROJECTION = {
+    '_id': 0,
+    'type': 1,
+    'status': 1,
+    'timestamp': 1,
+    'created_at': 1,
+    'analyzed_at': 1,
+    'metrics': 1,
+    'processing_metadata.total_ads': 1,
+}
+
+
+def _ts_to_dt(ts) -> datetime:
+    """
+    Coercer un timestamp (datetime BSON ou chaîne ISO) en datetime naïf UTC
+
+    Les deux formes coexistent dans ads_metrics (datetimes natifs des
+    phases, chaînes ISO de documents importés): comparer les valeurs
+    brutes lèverait TypeError (str vs datetime). Les datetimes pymongo
+    sont naïfs UTC alors qu'une chaîne ISO peut porter un offset ou un
+    'Z': tout est ramené sur une base naïve UTC, sinon la comparaison
+    naïf/aware lève TypeError à son tour.
+
+    Returns:
+        datetime naïf UTC, ou None si la valeur n'est pas interprétable
+    """
+    if isinstance(ts, str):
+        try:
+            ts = datetime.fromisoformat(ts)
+        except ValueError:
+            return None
+    if not isinstance(ts, datetime):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _normalize_dates(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Déballer la forme ExtendedJSON {'$date': ...} en chaîne ISO
+
+    Normaliser une seule fois au chargement évite de répéter les
+    isinstance(dict) sur chaque chemin chaud du dashboard. On garde la
+    forme chaîne ISO (et pas datetime) car c'est le format écrit par les
+    phases via datetime.now().isoformat().
+    """
+    for field in _DATE_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, dict) and '$date' in value:
+            doc[field] = value['$date']
+    return doc
+
 
 class DataLoader:
     """Charge toutes les données nécessaires au dashboard depuis MongoDB"""
     
     def __init__(self):
         """Initialiser la connexion MongoDB"""
-        self.mongo_client = MongoDBClient()
+        self.mongo_client = get_mongo_client()
         self.db = self.mongo_client.db
         logger.info("DataLoader initialisé avec connexion MongoDB")
     
-    def get_all_stores(self) -> List[Dict[str, Any]]:
+    # Taille de lot des curseurs: de gros lots réduisent les allers-retours
+    # tout en permettant de streamer sans matérialiser toute la collection
+    CURSOR_BATCH_SIZE = 5000
+
+    def get_all_stores(self, projection: Dict[str, int] = None,
+                       stream: bool = False):
         """
         Récupérer TOUS les clients de la collection stores
-        
+
+        Args:
+            projection: Projection MongoDB (None = documents complets).
+                        Projeter uniquement les champs utilisés réduit les
+                        octets transférés et le coût de décodage BSON.
+            stream: True = retourner le curseur (mémoire O(batch))
+
         Returns:
-            Liste de tous les clients (21,764 total)
+            Liste (ou curseur) de tous les clients (21,764 total)
         """
-        stores = list(self.db.stores.find())
+        cursor = self.db.stores.find({}, projection) \
+            .batch_size(self.CURSOR_BATCH_SIZE)
+        if stream:
+            return cursor
+        stores = list(cursor)
         logger.info(f"Chargé {len(stores)} clients depuis stores")
         return stores
-    
-    def get_mappings(self, status_filter: str = None) -> List[Dict[str, Any]]:
+
+    def get_mappings(self, status_filter: str = None, stream: bool = False):
         """
         Récupérer les mappings Phase 1 (type='mapping')
-        
+
         Args:
             status_filter: Filtrer par status ('active', 'inactive', None=tous)
-        
+            stream: True = itérateur paresseux (mémoire O(batch))
+
         Returns:
-            Liste des mappings Phase 1
+            Liste (ou itérateur) des mappings Phase 1
         """
         query = {'type': 'mapping'}
         if status_filter:
             query['status'] = status_filter
-        
-        mappings = list(self.db.ads_metrics.find(query))
+
+        cursor = self.db.ads_metrics.find(query, _MAPPING_PROJECTION) \
+            .batch_size(self.CURSOR_BATCH_SIZE)
+        if stream:
+            return (_normalize_dates(m) for m in cursor)
+        mappings = [_normalize_dates(m) for m in cursor]
         logger.info(f"Chargé {len(mappings)} mappings (filtre: {status_filter or 'tous'})")
         return mappings
-    
-    def get_reports(self, status_filter: str = None) -> List[Dict[str, Any]]:
+
+    def get_reports(self, status_filter: str = None, stream: bool = False):
         """
         Récupérer les rapports Phase 2 (type='report')
-        
+
         Args:
             status_filter: Filtrer par status
-        
+            stream: True = itérateur paresseux (mémoire O(batch))
+
         Returns:
-            Liste des rapports de classification Phase 2
+            Liste (ou itérateur) des rapports de classification Phase 2
         """
         query = {'type': 'report'}
         if status_filter:
             query['status'] = status_filter
-        
-        reports = list(self.db.ads_metrics.find(query))
+
+        cursor = self.db.ads_metrics.find(query, _REPORT_PROJECTION) \
+            .batch_size(self.CURSOR_BATCH_SIZE)
+        if stream:
+            return (_normalize_dates(r) for r in cursor)
+        reports = [_normalize_dates(r) for r in cursor]
         logger.info(f"Chargé {len(reports)} rapports Phase 2")
         return reports
     
+    def get_latest_reports(self) -> List[Dict[str, Any]]:
+        """
+        Dernier rapport Phase 2 de CHAQUE client, groupé côté MongoDB
+
+        $sort + $group/$first renvoie au plus un document par client: le
+        facteur d'historique (plusieurs rapports par client) ne transite
+        jamais vers Python.
+
+        Returns:
+            Liste des derniers rapports (un par client_id)
+        """
+        pipeline = [
+            {'$match': {'type': 'report'}},
+            {'$sort': {'analyzed_at': -1}},
+            {'$group': {'_id': '$client_id', 'doc': {'$first': '$$ROOT'}}},
+            {'$replaceRoot': {'newRoot': '$doc'}},
+            {'$project': _REPORT_PROJECTION}
+        ]
+        cursor = self.db.ads_metrics.aggregate(pipeline, allowDiskUse=True)
+        latest = [_normalize_dates(r) for r in cursor]
+        logger.info(f"Chargé {len(latest)} derniers rapports (groupés côté MongoDB)")
+        return latest
+
+    def get_latest_report(self) -> Dict[str, Any]:
+        """
+        Récupérer le dernier rapport Phase 2 (tri indexé côté MongoDB)
+
+        Évite un scan linéaire max() en Python sur toute la liste des rapports.
+
+        Returns:
+            Dernier rapport par analyzed_at, ou None
+        """
+        report = self.db.ads_metrics.find_one(
+            {'type': 'report'},
+            sort=[('analyzed_at', -1)]
+        )
+        return _normalize_dates(report) if report else None
+
+    def search_client_ids(self, search_query: str) -> Set[str]:
+        """
+        Rechercher les client_ids côté MongoDB (sous-chaîne, insensible à la casse)
+
+        Mêmes sémantiques que l'ancien filtre Python (« vino » trouve
+        « ravino »): regex non ancrée, car une ancre '^' n'apporterait
+        rien ici — avec '\$options': 'i' MongoDB ne peut de toute façon
+        pas borner le parcours d'un index standard. Le gain vient du
+        filtrage serveur + projection: seuls les ids correspondants
+        transitent, pas toute la collection.
+
+        Args:
+            search_query: Sous-chaîne du client_id recherché
+
+        Returns:
+            Ensemble des client_ids correspondants
+        """
+        query = {
+            'type': 'mapping',
+            'client_id': {
+                '$regex': re.escape(search_query),
+                '$options': 'i'
+            }
+        }
+        cursor = self.db.ads_metrics.find(query, {'client_id': 1, '_id': 0})
+        return {doc['client_id'] for doc in cursor}
+
+    def load_incremental(self, last_ts: datetime = None):
+        """
+        Charger uniquement les documents ads_metrics modifiés depuis last_ts
+
+        Permet un cache incrémental côté dashboard: coût O(docs modifiés)
+        au lieu de O(collection entière) à chaque refresh.
+
+        Args:
+            last_ts: Timestamp du dernier document déjà vu (None = tout charger)
+
+        Returns:
+            (documents modifiés, nouveau last_ts à mémoriser)
+        """
+        query = {}
+        if last_ts is not None:
+            query['timestamp'] = {'$gt': last_ts}
+
+        cursor = self.db.ads_metrics.find(query, _INCREMENTAL_PROJECTION) \
+            .batch_size(self.CURSOR_BATCH_SIZE)
+        docs = [_normalize_dates(d) for d in cursor]
+
+        # Avance du watermark comparée via datetimes coercés: la valeur
+        # brute du document le plus récent est conservée pour le filtre
+        # $gt suivant (même type bracket BSON que les documents)
+        new_last_ts = last_ts
+        new_last_dt = _ts_to_dt(last_ts)
+        for doc in docs:
+            ts = doc.get('timestamp')
+            ts_dt = _ts_to_dt(ts)
+            if ts_dt is None:
+                continue
+            if new_last_dt is None or ts_dt > new_last_dt:
+                new_last_dt = ts_dt
+                new_last_ts = ts
+
+        logger.info(f"Chargement incrémental: {len(docs)} documents "
+                    f"(depuis {last_ts or 'le début'})")
+        return docs, new_last_ts
+
+    def get_kpi_aggregates(self, top_limit: int = 10) -> Dict[str, Any]:
+        """
+        KPIs concurrents calculés côté MongoDB en un seul pipeline $facet
+
+        Le top concurrents et la répartition des plateformes n'ont pas
+        besoin des rapports complets côté Python: un $unwind + $group
+        serveur renvoie quelques dizaines de lignes au lieu de streamer
+        tous les tableaux competitors.
+
+        Args:
+            top_limit: Taille du top concurrents
+
+        Returns:
+            {
+                'top_competitors': [{'domain', 'count', 'platform'}, ...],
+                'platform_distribution': {'Shopify': 45, ...}
+            }
+        """
+        pipeline = [
+            {'$match': {'type': 'report'}},
+            {'$unwind': '$competitors'},
+            {'$facet': {
+                'top_competitors': [
+                    {'$group': {
+                        '_id': '$competitors.domain',
+                        'count': {'$sum': {'$ifNull': ['$competitors.total_ads', 1]}},
+                        'platform': {'$first': '$competitors.platform'}
+                    }},
+                    {'$sort': {'count': -1}},
+                    {'$limit': top_limit}
+                ],
+                'platforms': [
+                    {'$group': {
+                        '_id': {'$ifNull': ['$competitors.platform', 'Unknown']},
+                        'count': {'$sum': {'$ifNull': ['$competitors.total_ads', 1]}}
+                    }}
+                ]
+            }}
+        ]
+        facets = next(iter(self.db.ads_metrics.aggregate(pipeline)), {})
+
+        top = [
+            {
+                'domain': row['_id'],
+                'count': row['count'],
+                'platform': row.get('platform') or 'Unknown'
+            }
+            for row in facets.get('top_competitors', [])
+            if row.get('_id')
+        ]
+        platforms = {
+            row['_id']: row['count'] for row in facets.get('platforms', [])
+        }
+
+        logger.info(f"KPIs agrégés côté MongoDB: {len(top)} concurrents, "
+                    f"{len(platforms)} plateformes")
+        return {
+            'top_competitors': top,
+            'platform_distribution': platforms
+        }
+
+    def get_client_history(self, client_id: str) -> List[Dict[str, Any]]:
+        """
+        Historique des exécutions d'UN client via requête indexée
+
+        Utilise l'index idx_client_type_timestamp: O(log N + k) documents
+        lus côté serveur au lieu d'un scan Python des 21k+ mappings et
+        rapports à chaque consultation.
+
+        Args:
+            client_id: ID du client
+
+        Returns:
+            Lignes d'historique triées par date décroissante
+        """
+        cursor = self.db.ads_metrics \
+            .find({'client_id': client_id}, _HISTORY_PROJECTION) \
+            .sort('timestamp', -1)
+
+        history = []
+        for doc in cursor:
+            _normalize_dates(doc)
+            if doc.get('type') == 'report':
+                metrics = doc.get('metrics', {})
+                history.append({
+                    'date': doc.get('analyzed_at') or doc.get('timestamp'),
+                    'phase': 'Phase 2',
+                    'type': 'report',
+                    'total_ads': metrics.get('total_ads', 0),
+                    'converty_ads': metrics.get('converty_ads', 0),
+                    'concurrent_ads': metrics.get('concurrent_ads', 0),
+                    'converty_ratio': metrics.get('converty_ratio', 0)
+                })
+            else:
+                history.append({
+                    'date': doc.get('timestamp') or doc.get('created_at'),
+                    'phase': 'Phase 1',
+                    'type': 'mapping',
+                    'status': doc.get('status'),
+                    'total_ads': doc.get('processing_metadata', {}).get('total_ads', 0)
+                })
+
+        history.sort(key=lambda x: x['date'] or '', reverse=True)
+        return history
+
     def get_client_detail(self, client_id: str) -> Dict[str, Any]:
         """
         Récupérer TOUTES les données d'un client spécifique
@@ -79,26 +401,25 @@ class DataLoader:
                 'report': {...}           # Rapport Phase 2 (si existe)
             }
         """
-        # Store
-        store = self.db.stores.find_one({'slug': client_id})
-        
-        # Mapping Phase 1
-        mapping = self.db.ads_metrics.find_one({
-            'client_id': client_id,
-            'type': 'mapping'
-        })
-        
-        # Report Phase 2
-        report = self.db.ads_metrics.find_one({
-            'client_id': client_id,
-            'type': 'report'
-        })
-        
-        return {
-            'store': store,
-            'mapping': mapping,
-            'report': report
-        }
+        # Trois find_one indépendants recouverts par un pool de threads:
+        # la page détail coûte un seul aller-retour réseau au lieu de trois
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            store_f = executor.submit(self.db.stores.find_one, {'slug': client_id})
+            mapping_f = executor.submit(
+                self.db.ads_metrics.find_one,
+                {'client_id': client_id, 'type': 'mapping'}
+            )
+            # Report Phase 2 (sans page_details: détails par ad jamais rendus)
+            report_f = executor.submit(
+                self.db.ads_metrics.find_one,
+                {'client_id': client_id, 'type': 'report'},
+                {'page_details': 0}
+            )
+            return {
+                'store': store_f.result(),
+                'mapping': mapping_f.result(),
+                'report': report_f.result()
+            }
     
     def get_all_data(self) -> Dict[str, Any]:
         """
@@ -115,22 +436,31 @@ class DataLoader:
             }
         """
         logger.info("Chargement complet des données...")
-        
-        # Charger tout
-        stores = self.get_all_stores()
-        all_mappings = self.get_mappings()
-        mappings_active = self.get_mappings(status_filter='active')
-        mappings_inactive = self.get_mappings(status_filter='inactive')
-        reports = self.get_reports()
-        
-        data = {
-            'stores': stores,
-            'mappings': all_mappings,
-            'mappings_active': mappings_active,
-            'mappings_inactive': mappings_inactive,
-            'reports': reports,
-            'loaded_at': datetime.now()
-        }
+
+        # Requêtes indépendantes lancées en parallèle: pymongo relâche le
+        # GIL pendant l'I/O réseau (MongoClient est thread-safe), le temps
+        # de chargement ≈ max des requêtes au lieu de leur somme
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                'stores': executor.submit(self.get_all_stores),
+                'mappings': executor.submit(self.get_mappings),
+                'reports': executor.submit(self.get_reports),
+            }
+            data = {key: future.result() for key, future in futures.items()}
+        data['loaded_at'] = datetime.now()
+
+        stores = data['stores']
+        all_mappings = data['mappings']
+        reports = data['reports']
+
+        # Partitions actif/inactif dérivées localement: les mappings
+        # portent déjà status, inutile de rescanner la collection deux fois
+        data['mappings_active'] = [
+            m for m in all_mappings if m.get('status') == 'active'
+        ]
+        data['mappings_inactive'] = [
+            m for m in all_mappings if m.get('status') == 'inactive'
+        ]
         
         logger.info(f"Chargement terminé: {len(stores)} stores, "
                    f"{len(all_mappings)} mappings, {len(reports)} reports")
@@ -3,12 +3,51 @@ MetricsCalculator - Calcule tous les KPIs dynamiquement
 """
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
-from collections import Counter
+from collections import Counter, defaultdict
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 
+# Dispatch par type exact: un lookup de dict est plus rapide qu'une
+# cascade isinstance répétée sur des milliers de documents
+_DT_PARSERS = {
+    dict: lambda v: datetime.fromisoformat(v['$date'].replace('Z', '+00:00')),
+    str: lambda v: datetime.fromisoformat(v.replace('Z', '+00:00')),
+    datetime: lambda v: v,
+}
+
+
+def _parse_dt(val) -> datetime:
+    """
+    Parser une date ISO ('...' ou {'$date': '...'}) — datetime.min si invalide
+    """
+    if not val:
+        return datetime.min
+    try:
+        return _DT_PARSERS[type(val)](val)
+    except (KeyError, ValueError, TypeError):
+        return datetime.min
+
+
+def _doc_dt(doc: Dict[str, Any]) -> datetime:
+    """
+    Date du document, parsée une seule fois puis cachée sur le dict (_dt)
+
+    fromisoformat + replace coûtent cher répétés sur des milliers de
+    rapports: chaque consommateur suivant ne paie qu'une lecture de clé.
+    """
+    dt = doc.get('_dt')
+    if dt is None:
+        dt = _parse_dt(doc.get('analyzed_at') or doc.get('timestamp'))
+        doc['_dt'] = dt
+    return dt
+
+
 class MetricsCalculator:
     """Calcule tous les indicateurs clés depuis les données MongoDB"""
     
@@ -21,48 +60,169 @@ class MetricsCalculator:
         """
         self.stores = data.get('stores', [])
         self.mappings = data.get('mappings', [])
-        self.mappings_active = data.get('mappings_active', [])
-        self.mappings_inactive = data.get('mappings_inactive', [])
+        # Partitions par statut: listes fournies par le chargeur si
+        # présentes, sinon dérivées paresseusement de self.mappings
+        # (cached_property) — une seule liste source, références partagées
+        self._provided_active = data.get('mappings_active')
+        self._provided_inactive = data.get('mappings_inactive')
         self.reports = data.get('reports', [])
         self.loaded_at = data.get('loaded_at', datetime.now())
-    
-    def get_overview_kpis(self) -> Dict[str, Any]:
+        # Agrégats $facet calculés côté MongoDB (DataLoader.get_kpi_aggregates);
+        # None si le chargeur ne les fournit pas (repli boucles Python)
+        self.kpi_aggregates = data.get('kpi_aggregates')
+        # Derniers rapports par client déjà groupés côté MongoDB
+        # (DataLoader.get_latest_reports); None = dérivés de self.reports
+        self.latest_reports = data.get('latest_reports')
+        self._all = None  # Cache du calcul fusionné compute_all()
+        self._agg = None  # Agrégats intermédiaires (latest, compteurs concurrents)
+        # Mémoïsation des accesseurs paramétrés, clé (méthode, args): les
+        # données ne mutent jamais après __init__, un repaint du dashboard
+        # avec les mêmes arguments relit le résultat déjà calculé
+        self._method_cache: Dict[tuple, Any] = {}
+
+    # ------------------------------------------------------------------
+    # Index par client_id, construits paresseusement au premier accès
+    # puis mémorisés (cached_property): les pages du dashboard qui ne
+    # consultent ni la table ni l'historique ne paient jamais leur coût
+    # ------------------------------------------------------------------
+
+    @cached_property
+    def mappings_active(self) -> List[Dict[str, Any]]:
+        """Mappings actifs (partition dérivée au premier accès)"""
+        if self._provided_active is not None:
+            return self._provided_active
+        return [m for m in self.mappings if m.get('status') == 'active']
+
+    @cached_property
+    def mappings_inactive(self) -> List[Dict[str, Any]]:
+        """Mappings inactifs (partition dérivée au premier accès)"""
+        if self._provided_inactive is not None:
+            return self._provided_inactive
+        return [m for m in self.mappings if m.get('status') == 'inactive']
+
+    @cached_property
+    def _inactive_by_cid(self) -> Dict[str, Dict[str, Any]]:
+        """Mapping inactif par client_id (lookup O(1) pour la table)"""
+        return {m.get('client_id'): m for m in self.mappings_inactive}
+
+    @cached_property
+    def _mappings_by_cid(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Mappings Phase 1 bucketisés par client_id"""
+        buckets = defaultdict(list)
+        for m in self.mappings:
+            buckets[m.get('client_id')].append(m)
+        return buckets
+
+    @cached_property
+    def _reports_by_cid(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Rapports Phase 2 bucketisés par client_id"""
+        buckets = defaultdict(list)
+        for r in self.reports:
+            buckets[r.get('client_id')].append(r)
+        return buckets
+
+    def compute_all(self) -> Dict[str, Any]:
         """
-        Calculer les KPIs de vue d'ensemble
-        
-        IMPORTANT:
-        - Actifs = clients avec type='report' (Phase 2) - données les plus récentes
-        - Inactifs = clients avec status='inactive' ET type='mapping' (Phase 1)
-        
+        Calculer TOUS les KPIs du dashboard en un seul passage sur les données
+
+        Fusionne get_overview_kpis, get_ads_kpis et les deux distributions
+        d'activité: les rapports Phase 2 ne sont parcourus qu'une seule fois.
+        Le résultat est mémorisé sur l'instance (les données ne changent pas
+        après __init__).
+
         Returns:
             {
-                'total_clients': 21764,
-                'clients_traités': 718,
-                'clients_restants': 21046,
-                'progression': 3.3,
-                'actifs': 40,
-                'inactifs': 678,
-                'ratio_actifs': 5.6
+                'overview': {...},                        # KPIs vue d'ensemble
+                'ads': {...},                             # KPIs publicités
+                'activity_distribution': {...},           # Bins clients actifs
+                'activity_distribution_inactive': {...}   # Bins clients inactifs
             }
         """
-        total_clients = len(self.stores)
-        traités = len(self.mappings)
+        if self._all is not None:
+            return self._all
 
-        # Prendre le DERNIER rapport par client (dernier analyzed_at)
-        latest_reports = self._latest_report_per_client()
+        # --- Passage UNIQUE sur les rapports Phase 2 ---
+        # Tous les agrégats (KPIs, dernier rapport par client, compteurs
+        # concurrents) sont construits dans la même boucle: les rapports ne
+        # sont parcourus qu'une fois, quel que soit le nombre de get_*
+        latest: Dict[str, Dict[str, Any]] = {}
+        latest_dt: Dict[str, datetime] = {}
+        # Si le groupage serveur est disponible, inutile de suivre les
+        # dates dans la boucle: l'index latest est fourni tout fait
+        track_latest = self.latest_reports is None
+        converty_ads = 0
+        competitor_ads = 0
+        domain_counts = Counter()
+        domain_platforms: Dict[str, str] = {}
+        platform_counts = Counter()
 
-        # Actifs = clients dont le dernier rapport a des publicités (>0)
-        actifs = sum(1 for r in latest_reports.values()
-                 if r.get('metrics', {}).get('total_ads', 0) > 0)
+        for r in self.reports:
+            metrics = r.get('metrics', {})
+            converty_ads += metrics.get('converty_ads', 0)
+            competitor_ads += metrics.get('concurrent_ads', 0)
 
-        # Inactifs = (1) derniers rapports avec 0 ads + (2) mappings inactifs sans rapport
-        inactive_from_reports = {cid for cid, r in latest_reports.items()
-                     if r.get('metrics', {}).get('total_ads', 0) == 0}
-        inactive_phase1_only = {m.get('client_id') for m in self.mappings_inactive
-                     if m.get('client_id') not in latest_reports}
-        inactifs = len(inactive_from_reports | inactive_phase1_only)
-        
-        kpis = {
+            for comp in r.get('competitors') or ():
+                comp_get = comp.get
+                ads_weight = comp_get('total_ads', 1)
+                platform = comp_get('platform') or 'Unknown'
+                platform_counts[platform] += ads_weight
+                domain = comp_get('domain')
+                if domain:
+                    domain_counts[domain] += ads_weight
+                    domain_platforms[domain] = platform
+
+            if not track_latest:
+                continue
+            cid = r.get('client_id') or r.get('client_slug')
+            if not cid:
+                continue
+            dt = _doc_dt(r)
+            if cid not in latest or dt >= latest_dt[cid]:
+                latest[cid] = r
+                latest_dt[cid] = dt
+
+        if not track_latest:
+            for r in self.latest_reports:
+                cid = r.get('client_id') or r.get('client_slug')
+                if cid:
+                    latest[cid] = r
+
+        self._agg = {
+            'latest': latest,
+            'domain_counts': domain_counts,
+            'domain_platforms': domain_platforms,
+            'platform_counts': platform_counts
+        }
+
+        # Actifs/inactifs depuis le DERNIER rapport par client: les
+        # total_ads sont extraits en colonne NumPy, comparaison et somme
+        # vectorisées (le tableau filtré nourrit directement np.histogram)
+        latest_totals = np.fromiter(
+            (r.get('metrics', {}).get('total_ads', 0) for r in latest.values()),
+            dtype=np.int32, count=len(latest)
+        )
+        active_mask = latest_totals > 0
+        actifs = int(active_mask.sum())
+        active_ads_counts = latest_totals[active_mask]
+        inactive_ids = {
+            cid for cid, total in zip(latest, latest_totals.tolist())
+            if total <= 0
+        }
+
+        # --- Passage unique sur les mappings inactifs Phase 1 ---
+        inactive_ads_counts = []
+        for m in self.mappings_inactive:
+            if m.get('client_id') not in latest:
+                inactive_ids.add(m.get('client_id'))
+            inactive_ads_counts.append(
+                m.get('processing_metadata', {}).get('total_ads', 0)
+            )
+        inactifs = len(inactive_ids)
+
+        # KPIs vue d'ensemble
+        total_clients = len(self.stores)
+        traités = len(self.mappings)
+        overview = {
             'total_clients': total_clients,
             'clients_traités': traités,
             'clients_restants': total_clients - traités,
@@ -72,48 +232,94 @@ class MetricsCalculator:
             'ratio_actifs': (actifs / traités * 100) if traités > 0 else 0,
             'ratio_inactifs': (inactifs / traités * 100) if traités > 0 else 0
         }
-        
-        logger.debug(f"KPIs calculés: {traités}/{total_clients} clients ({kpis['progression']:.1f}%)")
-        return kpis
-    
-    def get_ads_kpis(self) -> Dict[str, Any]:
-        """
-        Calculer les KPIs publicités (depuis Phase 1 et Phase 2)
-        
-        Returns:
-            {
-                'total_ads': 1234,
-                'converty_ads': 800,
-                'competitor_ads': 434,
-                'ratio_converty': 65.0
-            }
-        """
-        # Si Phase 2 est disponible, utiliser UNIQUEMENT les rapports (données cohérentes)
+
+        # KPIs publicités (fallback Phase 1 si aucun rapport)
         if self.reports:
-            converty_ads = sum(r.get('metrics', {}).get('converty_ads', 0) for r in self.reports)
-            competitor_ads = sum(r.get('metrics', {}).get('concurrent_ads', 0) for r in self.reports)
             total_ads = converty_ads + competitor_ads
         else:
-            # Sinon utiliser Phase 1
             total_ads = sum(
-                m.get('processing_metadata', {}).get('total_ads', 0) 
+                m.get('processing_metadata', {}).get('total_ads', 0)
                 for m in self.mappings
             )
             converty_ads = 0
             competitor_ads = 0
-        
+
         total_classified = converty_ads + competitor_ads
-        
-        kpis = {
+        ads = {
             'total_ads': total_ads,
             'converty_ads': converty_ads,
             'competitor_ads': competitor_ads,
             'ratio_converty': (converty_ads / total_classified * 100) if total_classified > 0 else 0,
             'has_phase2_data': len(self.reports) > 0
         }
+
+        self._all = {
+            'overview': overview,
+            'ads': ads,
+            'activity_distribution': self._bin_ads_counts(active_ads_counts),
+            'activity_distribution_inactive': self._bin_ads_counts(inactive_ads_counts)
+        }
+
+        logger.debug(f"compute_all: {traités}/{total_clients} clients, "
+                     f"{len(self.reports)} rapports agrégés en un passage")
+        return self._all
+
+    # Bins standards de distribution d'activité (compteurs entiers:
+    # [0,6) ≡ 0-5 inclus, [6,11) ≡ 5-10, etc.)
+    _BIN_LABELS = ['0-5', '5-10', '10-20', '20+']
+    _BIN_EDGES = [0, 6, 11, 21, float('inf')]
+
+    @staticmethod
+    def _bin_ads_counts(ads_counts) -> Dict[str, List[Any]]:
+        """
+        Regrouper des compteurs de publicités dans les bins standards
+
+        np.histogram compte en C sur tout le tableau au lieu d'une
+        boucle Python avec chaîne if/elif par client. Accepte une liste
+        ou directement une colonne NumPy (aucune copie dans ce cas).
+        """
+        if not isinstance(ads_counts, np.ndarray):
+            ads_counts = np.fromiter(ads_counts, dtype=np.int32)
+        counts, _ = np.histogram(ads_counts, bins=MetricsCalculator._BIN_EDGES)
+        return {
+            'bins': list(MetricsCalculator._BIN_LABELS),
+            'counts': counts.tolist()
+        }
+
+    def get_overview_kpis(self) -> Dict[str, Any]:
+        """
+        Calculer les KPIs de vue d'ensemble
+        
+        IMPORTANT:
+        - Actifs = clients avec type='report' (Phase 2) - données les plus récentes
+        - Inactifs = clients avec status='inactive' ET type='mapping' (Phase 1)
+        
+        Returns:
+            {
+                'total_clients': 21764,
+                'clients_traités': 718,
+                'clients_restants': 21046,
+                'progression': 3.3,
+                'actifs': 40,
+                'inactifs': 678,
+                'ratio_actifs': 5.6
+            }
+        """
+        return self.compute_all()['overview']
+    
+    def get_ads_kpis(self) -> Dict[str, Any]:
+        """
+        Calculer les KPIs publicités (depuis Phase 1 et Phase 2)
         
-        logger.debug(f"Ads KPIs: {total_ads} total, {converty_ads} Converty, {competitor_ads} Concurrent (Phase 2: {len(self.reports)} reports)")
-        return kpis
+        Returns:
+            {
+                'total_ads': 1234,
+                'converty_ads': 800,
+                'competitor_ads': 434,
+                'ratio_converty': 65.0
+            }
+        """
+        return self.compute_all()['ads']
     
     def get_top_competitors(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -128,36 +334,26 @@ class MetricsCalculator:
                 ...
             ]
         """
+        # Agrégats serveur disponibles: le top est déjà calculé par
+        # $unwind + $group + $sort côté MongoDB
+        if self.kpi_aggregates is not None:
+            return self.kpi_aggregates.get('top_competitors', [])[:limit]
+
         if not self.reports:
             return []
-        
-        # Agréger tous les concurrents depuis la vraie structure
-        all_competitors = []
-        for report in self.reports:
-            # Utiliser le champ competitors (pas classification)
-            competitors = report.get('competitors', [])
-            all_competitors.extend(competitors)
-        
-        # Compter par domaine
-        competitor_counts = Counter()
-        competitor_platforms = {}
-        
-        for comp in all_competitors:
-            domain = comp.get('domain')
-            if domain:
-                competitor_counts[domain] += comp.get('total_ads', 1)
-                competitor_platforms[domain] = comp.get('platform', 'Unknown')
-        
-        # Top N
+
+        # Repli local: compteurs déjà construits par le passage fusionné
+        self.compute_all()
+        platforms = self._agg['domain_platforms']
         top = [
             {
                 'domain': domain,
                 'count': count,
-                'platform': competitor_platforms.get(domain, 'Unknown')
+                'platform': platforms.get(domain, 'Unknown')
             }
-            for domain, count in competitor_counts.most_common(limit)
+            for domain, count in self._agg['domain_counts'].most_common(limit)
         ]
-        
+
         logger.debug(f"Top {limit} concurrents calculés")
         return top
     
@@ -168,19 +364,16 @@ class MetricsCalculator:
         Returns:
             {'Shopify': 45, 'WooCommerce': 30, 'Custom': 15, ...}
         """
+        # Répartition déjà groupée côté MongoDB si disponible
+        if self.kpi_aggregates is not None:
+            return dict(self.kpi_aggregates.get('platform_distribution', {}))
+
         if not self.reports:
             return {}
-        
-        platform_counts = Counter()
-        
-        for report in self.reports:
-            # Utiliser le champ competitors (pas classification)
-            competitors = report.get('competitors', [])
-            for comp in competitors:
-                platform = comp.get('platform', 'Unknown')
-                platform_counts[platform] += comp.get('total_ads', 1)
-        
-        return dict(platform_counts)
+
+        # Repli local: compteur déjà construit par le passage fusionné
+        self.compute_all()
+        return dict(self._agg['platform_counts'])
     
     def get_time_series_data(self, days: int = 30) -> Dict[str, List[Any]]:
         """
@@ -197,54 +390,48 @@ class MetricsCalculator:
                 'nouveaux_reports': [...]
             }
         """
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Grouper mappings par jour
-        daily_mappings = Counter()
-        for mapping in self.mappings:
-            timestamp = mapping.get('timestamp') or mapping.get('created_at')
-            if timestamp:
-                try:
-                    if isinstance(timestamp, dict) and '$date' in timestamp:
-                        date = datetime.fromisoformat(timestamp['$date'].replace('Z', '+00:00'))
-                    elif isinstance(timestamp, str):
-                        date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    elif hasattr(timestamp, 'date'):
-                        date = timestamp
-                    else:
-                        continue
-                    
-                    if date >= cutoff_date:
-                        day_key = date.date()
-                        daily_mappings[day_key] += 1
-                except Exception:
-                    continue
-        
-        # Grouper reports Phase 2 par jour
-        daily_reports = Counter()
-        for report in self.reports:
-            timestamp = report.get('analyzed_at') or report.get('timestamp')
-            if timestamp:
-                try:
-                    if isinstance(timestamp, dict) and '$date' in timestamp:
-                        date = datetime.fromisoformat(timestamp['$date'].replace('Z', '+00:00'))
-                    elif isinstance(timestamp, str):
-                        date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    elif hasattr(timestamp, 'date'):
-                        date = timestamp
-                    else:
-                        continue
-                    
-                    if date >= cutoff_date:
-                        day_key = date.date()
-                        daily_reports[day_key] += 1
-                except Exception:
-                    continue
-        
+        cache_key = ('time_series', days)
+        if cache_key in self._method_cache:
+            return self._method_cache[cache_key]
+
+        cutoff = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)
+
+        def parsed_timestamps(key, docs, primary, fallback):
+            """Timestamps parsés en bloc, cachés indépendamment de days
+
+            Un seul pd.to_datetime par collection quelle que soit la
+            fenêtre demandée ensuite: changer le curseur de jours sur le
+            dashboard ne reparse plus les 21k+ dates.
+            """
+            parsed = self._method_cache.get(key)
+            if parsed is None:
+                raw = [
+                    ts['$date'] if isinstance(ts, dict) and '$date' in ts else ts
+                    for ts in (d.get(primary) or d.get(fallback) for d in docs)
+                    if ts is not None
+                ]
+                # to_datetime parse tout le lot en C (errors='coerce'
+                # rejette les formats invalides en NaT au lieu d'un
+                # try/except par ligne)
+                parsed = pd.to_datetime(pd.Series(raw), errors='coerce', utc=True)
+                self._method_cache[key] = parsed
+            return parsed
+
+        def daily_counts(parsed):
+            """Compter les documents par jour dans la fenêtre demandée"""
+            if parsed.empty:
+                return pd.Series(dtype='int64')
+            windowed = parsed[parsed >= cutoff]
+            return windowed.dt.date.value_counts().sort_index()
+
+        daily_mappings = daily_counts(parsed_timestamps(
+            ('mapping_ts',), self.mappings, 'timestamp', 'created_at'))
+        daily_reports = daily_counts(parsed_timestamps(
+            ('report_ts',), self.reports, 'analyzed_at', 'timestamp'))
+
         # Fusionner toutes les dates
-        all_dates = sorted(set(daily_mappings.keys()) | set(daily_reports.keys()))
-        
+        all_dates = sorted(set(daily_mappings.index) | set(daily_reports.index))
+
         # Si aucune donnée, retourner structure vide mais valide
         if not all_dates:
             return {
@@ -253,23 +440,17 @@ class MetricsCalculator:
                 'cumul_clients': [],
                 'nouveaux_reports': []
             }
-        
-        nouveaux_mappings = [daily_mappings.get(day, 0) for day in all_dates]
-        nouveaux_reports = [daily_reports.get(day, 0) for day in all_dates]
-        
-        # Calcul cumulatif
-        cumul = []
-        total = 0
-        for count in nouveaux_mappings:
-            total += count
-            cumul.append(total)
-        
-        return {
+
+        nouveaux_mappings = daily_mappings.reindex(all_dates, fill_value=0)
+
+        result = {
             'dates': all_dates,
-            'nouveaux_clients': nouveaux_mappings,
-            'cumul_clients': cumul,
-            'nouveaux_reports': nouveaux_reports
+            'nouveaux_clients': nouveaux_mappings.tolist(),
+            'cumul_clients': nouveaux_mappings.cumsum().tolist(),
+            'nouveaux_reports': daily_reports.reindex(all_dates, fill_value=0).tolist()
         }
+        self._method_cache[cache_key] = result
+        return result
 
     def get_status_time_series(self, days: int = 30) -> Dict[str, List[int]]:
         """
@@ -286,25 +467,17 @@ class MetricsCalculator:
                 'inactive_clients_cumulative': [...]
             }
         """
+        cache_key = ('status_series', days)
+        if cache_key in self._method_cache:
+            return self._method_cache[cache_key]
+
         cutoff_date = datetime.now() - timedelta(days=days)
 
         # Préparer liste des rapports avec date et statut
-        def parse_dt(val):
-            if not val:
-                return None
-            try:
-                if isinstance(val, dict) and '$date' in val:
-                    return datetime.fromisoformat(val['$date'].replace('Z', '+00:00'))
-                elif isinstance(val, str):
-                    return datetime.fromisoformat(val.replace('Z', '+00:00'))
-            except Exception:
-                return None
-            return None
-
         reports = []
         for r in self.reports:
-            dt = parse_dt(r.get('analyzed_at') or r.get('timestamp'))
-            if not dt:
+            dt = _doc_dt(r)
+            if dt == datetime.min:
                 continue
             if dt < cutoff_date:
                 continue
@@ -324,45 +497,36 @@ class MetricsCalculator:
                 'inactive_clients_cumulative': []
             }
 
-        # Groupes par jour pour counts de rapports
-        daily_active = Counter()
-        daily_inactive = Counter()
-        for rec in reports:
-            if rec['active']:
-                daily_active[rec['date']] += 1
-            else:
-                daily_inactive[rec['date']] += 1
-
-        # Dates ordonnées
-        all_dates = sorted(set([rec['date'] for rec in reports]))
-
-        # Cumul des statuts clients au fil du temps
-        # On applique les rapports jour par jour et on calcule le statut courant (dernier état)
-        status_by_client = {}
-        active_cum = []
-        inactive_cum = []
-
-        # Pour éviter des doubles mises à jour par jour, on prend le dernier report par client pour chaque jour
-        from collections import defaultdict
-        reports_by_day_client = defaultdict(dict)  # day -> client -> last active
-        for rec in sorted(reports, key=lambda x: x['dt']):
-            reports_by_day_client[rec['date']][rec['client_id']] = rec['active']
-
-        for day in all_dates:
-            for cid, active in reports_by_day_client[day].items():
-                status_by_client[cid] = active
-            active_count = sum(1 for v in status_by_client.values() if v)
-            inactive_count = len(status_by_client) - active_count
-            active_cum.append(active_count)
-            inactive_cum.append(inactive_count)
+        df = pd.DataFrame(reports)
 
-        return {
+        # Statut courant par client au fil des jours: dernier état du jour
+        # (drop_duplicates keep='last' après tri), puis propagation ffill
+        # jour par jour — remplace la relecture Python du dict
+        # status_by_client pour chaque jour
+        pv = (df.sort_values('dt')
+                .drop_duplicates(['date', 'client_id'], keep='last')
+                .pivot(index='date', columns='client_id', values='active')
+                .sort_index()
+                .ffill())
+        all_dates = list(pv.index)
+        active_cum = pv.sum(axis=1).astype(int)
+        inactive_cum = pv.notna().sum(axis=1) - active_cum
+
+        # Comptes de rapports par jour (vectorisés)
+        daily_active = df.loc[df['active'], 'date'] \
+            .value_counts().reindex(all_dates, fill_value=0)
+        daily_inactive = df.loc[~df['active'], 'date'] \
+            .value_counts().reindex(all_dates, fill_value=0)
+
+        result = {
             'dates': all_dates,
-            'active_reports': [daily_active.get(d, 0) for d in all_dates],
-            'inactive_reports': [daily_inactive.get(d, 0) for d in all_dates],
-            'active_clients_cumulative': active_cum,
-            'inactive_clients_cumulative': inactive_cum
+            'active_reports': daily_active.tolist(),
+            'inactive_reports': daily_inactive.tolist(),
+            'active_clients_cumulative': active_cum.tolist(),
+            'inactive_clients_cumulative': inactive_cum.tolist()
         }
+        self._method_cache[cache_key] = result
+        return result
     
     def get_activity_distribution(self) -> Dict[str, List[int]]:
         """
@@ -376,42 +540,7 @@ class MetricsCalculator:
                 'counts': [0, 5, 15, 20]  # nombre de clients actifs par catégorie
             }
         """
-        # Utiliser UNIQUEMENT les derniers rapports actifs (total_ads > 0)
-        latest_reports = self._latest_report_per_client()
-        if not latest_reports:
-            return {
-                'bins': ['0-5', '5-10', '10-20', '20+'],
-                'counts': [0, 0, 0, 0]
-            }
-        
-        ads_counts = [
-            r.get('metrics', {}).get('total_ads', 0)
-            for r in latest_reports.values()
-            if r.get('metrics', {}).get('total_ads', 0) > 0
-        ]
-        
-        # Créer les bins
-        bins = {
-            '0-5': 0,
-            '5-10': 0,
-            '10-20': 0,
-            '20+': 0
-        }
-        
-        for count in ads_counts:
-            if count <= 5:
-                bins['0-5'] += 1
-            elif count <= 10:
-                bins['5-10'] += 1
-            elif count <= 20:
-                bins['10-20'] += 1
-            else:
-                bins['20+'] += 1
-        
-        return {
-            'bins': list(bins.keys()),
-            'counts': list(bins.values())
-        }
+        return self.compute_all()['activity_distribution']
     
     def get_activity_distribution_inactive(self) -> Dict[str, List[int]]:
         """
@@ -425,72 +554,16 @@ class MetricsCalculator:
                 'counts': [600, 50, 20, 8]
             }
         """
-        # Utiliser UNIQUEMENT les inactifs
-        if not self.mappings_inactive:
-            return {
-                'bins': ['0-5', '5-10', '10-20', '20+'],
-                'counts': [0, 0, 0, 0]
-            }
-        
-        ads_counts = [
-            m.get('processing_metadata', {}).get('total_ads', 0)
-            for m in self.mappings_inactive
-        ]
-        
-        # Créer les bins
-        bins = {
-            '0-5': 0,
-            '5-10': 0,
-            '10-20': 0,
-            '20+': 0
-        }
-        
-        for count in ads_counts:
-            if count <= 5:
-                bins['0-5'] += 1
-            elif count <= 10:
-                bins['5-10'] += 1
-            elif count <= 20:
-                bins['10-20'] += 1
-            else:
-                bins['20+'] += 1
-        
-        return {
-            'bins': list(bins.keys()),
-            'counts': list(bins.values())
-        }
+        return self.compute_all()['activity_distribution_inactive']
 
     def _latest_report_per_client(self) -> Dict[str, Dict[str, Any]]:
         """Retourner le dernier rapport (Phase 2) pour chaque client.
-        Gère analyzed_at au format dict {'$date': ...} ou str.
+
+        Lit l'index construit par le passage fusionné compute_all (aucun
+        parcours supplémentaire des rapports).
         """
-        latest: Dict[str, Dict[str, Any]] = {}
-        def parse_dt(val):
-            if not val:
-                return datetime.min
-            try:
-                if isinstance(val, dict) and '$date' in val:
-                    s = val['$date']
-                    # Support '...Z' suffix
-                    return datetime.fromisoformat(s.replace('Z', '+00:00'))
-                if isinstance(val, str):
-                    return datetime.fromisoformat(val.replace('Z', '+00:00'))
-            except Exception:
-                return datetime.min
-            return datetime.min
-        for r in self.reports:
-            cid = r.get('client_id') or r.get('client_slug')
-            if not cid:
-                continue
-            dt = parse_dt(r.get('analyzed_at') or r.get('timestamp'))
-            prev = latest.get(cid)
-            if not prev:
-                latest[cid] = r
-            else:
-                prev_dt = parse_dt(prev.get('analyzed_at') or prev.get('timestamp'))
-                if dt >= prev_dt:
-                    latest[cid] = r
-        return latest
+        self.compute_all()
+        return self._agg['latest']
     
     
     def get_client_execution_history(self, client_id: str) -> List[Dict[str, Any]]:
@@ -504,31 +577,29 @@ class MetricsCalculator:
             Liste des exécutions avec timestamps et métriques
         """
         history = []
-        
+
         # Phase 1 mappings
-        for mapping in self.mappings:
-            if mapping.get('client_id') == client_id:
-                history.append({
-                    'date': mapping.get('timestamp') or mapping.get('created_at'),
-                    'phase': 'Phase 1',
-                    'type': 'mapping',
-                    'status': mapping.get('status'),
-                    'total_ads': mapping.get('processing_metadata', {}).get('total_ads', 0)
-                })
-        
+        for mapping in self._mappings_by_cid.get(client_id, ()):
+            history.append({
+                'date': mapping.get('timestamp') or mapping.get('created_at'),
+                'phase': 'Phase 1',
+                'type': 'mapping',
+                'status': mapping.get('status'),
+                'total_ads': mapping.get('processing_metadata', {}).get('total_ads', 0)
+            })
+
         # Phase 2 reports
-        for report in self.reports:
-            if report.get('client_id') == client_id:
-                metrics = report.get('metrics', {})
-                history.append({
-                    'date': report.get('analyzed_at') or report.get('timestamp'),
-                    'phase': 'Phase 2',
-                    'type': 'report',
-                    'total_ads': metrics.get('total_ads', 0),
-                    'converty_ads': metrics.get('converty_ads', 0),
-                    'concurrent_ads': metrics.get('concurrent_ads', 0),
-                    'converty_ratio': metrics.get('converty_ratio', 0)
-                })
+        for report in self._reports_by_cid.get(client_id, ()):
+            metrics = report.get('metrics', {})
+            history.append({
+                'date': report.get('analyzed_at') or report.get('timestamp'),
+                'phase': 'Phase 2',
+                'type': 'report',
+                'total_ads': metrics.get('total_ads', 0),
+                'converty_ads': metrics.get('converty_ads', 0),
+                'concurrent_ads': metrics.get('concurrent_ads', 0),
+                'converty_ratio': metrics.get('converty_ratio', 0)
+            })
         
         # Trier par date décroissante
         history.sort(key=lambda x: x['date'] if x['date'] else datetime.min, reverse=True)
@@ -557,6 +628,11 @@ class MetricsCalculator:
                 ...
             ]
         """
+        search_query = search_query.lower() if search_query else None
+        cache_key = ('table', status_filter, search_query)
+        if cache_key in self._method_cache:
+            return self._method_cache[cache_key]
+
         # Construire la vue "par client" basée sur le DERNIER rapport
         latest_reports = self._latest_report_per_client()
         exec_counts = Counter(r.get('client_id') or r.get('client_slug') for r in self.reports)
@@ -569,8 +645,8 @@ class MetricsCalculator:
         for client_id in sorted(all_client_ids):
             if not client_id:
                 continue
-            # Recherche
-            if search_query and search_query.lower() not in client_id.lower():
+            # Recherche (search_query déjà normalisé en minuscules)
+            if search_query and search_query not in client_id.lower():
                 continue
 
             latest = latest_reports.get(client_id)
@@ -584,8 +660,8 @@ class MetricsCalculator:
                 competitors = latest.get('competitors', [])
                 top_competitor = competitors[0].get('domain') if competitors else 'N/A'
             else:
-                # Aucun rapport Phase 2 → utiliser mapping Phase 1
-                mapping = next((m for m in self.mappings_inactive if m.get('client_id') == client_id), None)
+                # Aucun rapport Phase 2 → utiliser mapping Phase 1 (lookup O(1))
+                mapping = self._inactive_by_cid.get(client_id)
                 status = mapping.get('status', 'inactive') if mapping else 'inactive'
                 total_ads = mapping.get('processing_metadata', {}).get('total_ads', 0) if mapping else 0
                 timestamp = mapping.get('timestamp') if mapping else None
@@ -613,6 +689,7 @@ class MetricsCalculator:
         # Appliquer filtre de statut après construction
         if status_filter in {'active', 'inactive'}:
             table_data = [row for row in table_data if row['status'] == status_filter]
-        
+
+        self._method_cache[cache_key] = table_data
         logger.debug(f"Table data générée: {len(table_data)} clients")
         return table_data
@@ -3,6 +3,8 @@ Analyseur complet de publicités pour un client
 """
 from typing import Dict, Any, List
 from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from src.classification.url_classifier import URLClassifier
 from src.clients.apify_client import ApifyFacebookAdsClient
 from src.utils.logger import setup_logger
@@ -12,7 +14,12 @@ logger = setup_logger(__name__)
 
 class AdAnalyzer:
     """Analyse toutes les publicités d'un client"""
-    
+
+    # Pages Facebook analysées en parallèle par client: l'essentiel du
+    # temps est passé à attendre Apify (I/O réseau), la classification
+    # elle-même est légère et sans état partagé mutable
+    PAGE_WORKERS = 4
+
     def __init__(self):
         self.classifier = URLClassifier()
         self.apify_client = ApifyFacebookAdsClient()
@@ -62,20 +69,27 @@ class AdAnalyzer:
         
         logger.info(f"🟢 Client ACTIF ({total_ads} ads) - Phase 2 en cours...\n")
         
-        # Analyser chaque site du mapping
-        page_analyses = []
-        
+        # Collecter toutes les paires (page, domaine) du mapping
+        page_jobs = []
         for site_mapping in mapping_data['mappings']:
             converty_domain = site_mapping['site']
-            
+
             logger.info(f"\n{'─'*60}")
             logger.info(f"📍 Domaine Converty: {converty_domain}")
             logger.info(f"{'─'*60}")
-            
-            # Pour chaque page Facebook trouvée en Phase 1
+
             for page in site_mapping['fb_pages']:
-                page_analysis = self._analyze_page(page, converty_domain)
-                page_analyses.append(page_analysis)
+                page_jobs.append((page, converty_domain))
+
+        # Analyser les pages en parallèle: chaque _analyze_page bloque
+        # surtout sur le scraping Apify, le temps client tombe du cumul
+        # des latences à leur maximum (ordre des résultats préservé)
+        page_analyses = []
+        if page_jobs:
+            with ThreadPoolExecutor(max_workers=self.PAGE_WORKERS) as executor:
+                page_analyses = list(executor.map(
+                    lambda job: self._analyze_page(*job), page_jobs
+                ))
         
         # Calculer les statistiques globales
         stats = self._calculate_global_stats(page_analyses)
@@ -128,23 +142,27 @@ class AdAnalyzer:
         
         logger.info(f"   ✓ {len(all_page_ads)} publicités trouvées")
         logger.info(f"   🔍 Classification en cours...")
-        
+
+        # Pré-chauffer le cache DNS: les domaines distincts de la page
+        # sont résolus en parallèle avant la boucle, qui ne fait ensuite
+        # que des hits cache au lieu d'une résolution séquentielle par ad
+        self.classifier.prewarm_dns_cache(all_page_ads)
+
         # Classifier chaque publicité
         classified_ads = []
-        converty_count = 0
-        concurrent_count = 0
-        unknown_count = 0
-        
+        tags = []  # étiquettes de classification, comptées en bloc après
+
         # Pour identifier les concurrents (structure corrigée)
         competitors = {}  # {domain: {'count': int, 'platform': str}}
-        
+
         # 🔧 CORRECTION: Boucle avec indentation correcte
         for ad in all_page_ads:
             classification = self.classifier.classify_ad(ad, converty_domain)
-            
+            tag = classification['classification']
+
             classified_ad = {
                 'ad_id': ad.get('ad_archive_id'),
-                'classification': classification['classification'],
+                'classification': tag,
                 'confidence': classification['confidence'],
                 'reason': classification['reason'],
                 'destination_url': classification['destination_url'],
@@ -153,15 +171,12 @@ class AdAnalyzer:
                 'ad_creation_time': ad.get('ad_creation_time'),
                 'ad_delivery_start_time': ad.get('ad_delivery_start_time'),
             }
-            
+
             classified_ads.append(classified_ad)
-            
-            # Compter
-            if classification['classification'] == 'CONVERTY':
-                converty_count += 1
-            elif classification['classification'] == 'CONCURRENT':
-                concurrent_count += 1
-                # Enregistrer le concurrent avec sa plateforme
+            tags.append(tag)
+
+            # Enregistrer le concurrent avec sa plateforme
+            if tag == 'CONCURRENT':
                 competitor_domain = classification.get('competitor_domain')
                 if competitor_domain:
                     if competitor_domain not in competitors:
@@ -170,8 +185,12 @@ class AdAnalyzer:
                             'platform': classification.get('competitor_platform')
                         }
                     competitors[competitor_domain]['count'] += 1
-            else:
-                unknown_count += 1
+
+        # Comptage en bloc après la boucle: list.count parcourt en C,
+        # plus de chaîne if/elif par publicité dans la boucle chaude
+        converty_count = tags.count('CONVERTY')
+        concurrent_count = tags.count('CONCURRENT')
+        unknown_count = len(tags) - converty_count - concurrent_count
         
         # Calculer les ratios
         total = len(classified_ads)
@@ -240,38 +259,33 @@ class AdAnalyzer:
         }
     
     def _aggregate_competitors(self, page_analyses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Agréger tous les concurrents trouvés sur toutes les pages"""
-        all_competitors = {}  # {domain: {'count': int, 'platform': str}}
-        
+        """Agréger tous les concurrents trouvés sur toutes les pages
+
+        defaultdict(int) + dict plat des plateformes: un seul lookup par
+        élément au lieu du test d'existence + double indexation du dict
+        imbriqué d'origine.
+        """
+        counts = defaultdict(int)      # {domain: total ads}
+        platforms = {}                 # {domain: première plateforme connue}
+
         for page_analysis in page_analyses:
             for competitor in page_analysis.get('competitors', []):
                 domain = competitor['domain']
-                count = competitor['ads_count']
+                counts[domain] += competitor['ads_count']
                 platform = competitor.get('platform')
-                
-                if domain in all_competitors:
-                    all_competitors[domain]['count'] += count
-                    # Garder la plateforme si elle existe
-                    if not all_competitors[domain]['platform'] and platform:
-                        all_competitors[domain]['platform'] = platform
-                else:
-                    all_competitors[domain] = {
-                        'count': count,
-                        'platform': platform
-                    }
-        
+                if platform and not platforms.get(domain):
+                    platforms[domain] = platform
+
         # Trier par nombre d'ads (décroissant)
-        sorted_competitors = [
+        return [
             {
-                'domain': domain, 
-                'total_ads': data['count'],
-                'platform': data['platform']
+                'domain': domain,
+                'total_ads': count,
+                'platform': platforms.get(domain)
             }
-            for domain, data in sorted(
-                all_competitors.items(), 
-                key=lambda x: x[1]['count'], 
+            for domain, count in sorted(
+                counts.items(),
+                key=lambda x: x[1],
                 reverse=True
             )
-        ]
-        
-        return sorted_competitors
\ No newline at end of file
+        ]
\ No newline at end of file
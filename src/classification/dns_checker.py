@@ -4,6 +4,9 @@ Vérification DNS pour identifier les plateformes e-commerce
 import dns.resolver
 import socket
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from typing import Optional, Dict
 from src.utils.logger import setup_logger
 
@@ -35,9 +38,17 @@ class DNSChecker:
         }
     }
     
-    # Cache DNS avec TTL (600s = 10 minutes)
-    _cache: Dict[str, Dict] = {}
+    # Cache DNS TTL + LRU borné, protégé par verrou (les workers Phase 2
+    # et les analyses de pages parallèles partagent ce cache de classe).
+    # OrderedDict: move_to_end au hit, éviction du plus ancien au-delà
+    # de la taille maximale — mémoire bornée, entrées périmées purgées
+    _cache: "OrderedDict[str, Dict]" = OrderedDict()
     _cache_ttl = 600  # secondes
+    _cache_maxsize = 50_000
+    _cache_lock = Lock()
+    # Verrous par domaine en cours de résolution: deux threads qui
+    # tombent sur le même domaine ne déclenchent qu'une résolution
+    _inflight: Dict[str, Lock] = {}
     
     @classmethod
     def check_domain(cls, domain: str) -> Dict[str, any]:
@@ -57,22 +68,58 @@ class DNSChecker:
         """
         # Nettoyer le domaine
         domain = domain.lower().strip().replace('www.', '')
-        
+
         # ✅ CHECK CACHE AVEC TTL
-        if domain in cls._cache:
-            cached_entry = cls._cache[domain]
-            cache_age = time.time() - cached_entry.get('timestamp', 0)
-            
-            if cache_age < cls._cache_ttl:
-                logger.debug(f"🔄 Cache hit pour {domain} (age: {int(cache_age)}s)")
-                result = cached_entry['data'].copy()
-                result['cached'] = True
-                return result
-            else:
-                # Cache expiré, on le supprime
-                logger.debug(f"⏰ Cache expiré pour {domain}")
-                del cls._cache[domain]
-        
+        cached = cls._cache_get(domain)
+        if cached is not None:
+            return cached
+
+        # Verrou par domaine: les appels concurrents sur le même domaine
+        # attendent la résolution en cours au lieu de la dupliquer
+        with cls._cache_lock:
+            flight = cls._inflight.setdefault(domain, Lock())
+        try:
+            with flight:
+                # Un autre thread a pu résoudre pendant l'attente
+                cached = cls._cache_get(domain)
+                if cached is not None:
+                    return cached
+                return cls._resolve_domain(domain)
+        finally:
+            with cls._cache_lock:
+                cls._inflight.pop(domain, None)
+
+    @classmethod
+    def check_domains_bulk(cls, domains, max_workers: int = 32) -> Dict[str, Dict]:
+        """
+        Vérifier un lot de domaines en parallèle
+
+        Les résolutions DNS sont dominées par la latence réseau: un pool
+        de threads borné les recouvre, et le cache partagé + les verrous
+        par domaine (check_domain) garantissent qu'un domaine répété dans
+        le lot ne coûte qu'une seule résolution.
+
+        Args:
+            domains: Itérable de domaines (doublons tolérés)
+            max_workers: Plafond de résolutions simultanées
+
+        Returns:
+            {domaine normalisé: résultat check_domain}
+        """
+        # Normaliser et dédupliquer en préservant l'ordre
+        unique = list(dict.fromkeys(
+            d.lower().strip().replace('www.', '') for d in domains if d
+        ))
+        if not unique:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as executor:
+            results = executor.map(cls.check_domain, unique)
+        return dict(zip(unique, results))
+
+    @classmethod
+    def _resolve_domain(cls, domain: str) -> Dict[str, any]:
+        """Résolution DNS effective (appelée sous le verrou du domaine)"""
         # Initialiser le résultat
         result = {
             'platform': 'unknown',
@@ -170,32 +217,57 @@ class DNSChecker:
         
         return result
     
+    @classmethod
+    def _cache_get(cls, domain: str) -> Optional[Dict]:
+        """Lire le cache (TTL vérifié, entrée rafraîchie en tête LRU)"""
+        with cls._cache_lock:
+            entry = cls._cache.get(domain)
+            if entry is None:
+                return None
+            cache_age = time.time() - entry.get('timestamp', 0)
+            if cache_age >= cls._cache_ttl:
+                # Cache expiré, on le supprime
+                logger.debug(f"⏰ Cache expiré pour {domain}")
+                del cls._cache[domain]
+                return None
+            cls._cache.move_to_end(domain)
+            result = entry['data'].copy()
+        logger.debug(f"🔄 Cache hit pour {domain} (age: {int(cache_age)}s)")
+        result['cached'] = True
+        return result
+
     @classmethod
     def _save_to_cache(cls, domain: str, result: Dict) -> None:
-        """Sauvegarder dans le cache avec timestamp"""
-        cls._cache[domain] = {
-            'data': result.copy(),
-            'timestamp': time.time()
-        }
-    
+        """Sauvegarder dans le cache avec timestamp (éviction LRU au-delà
+        de la taille maximale)"""
+        with cls._cache_lock:
+            cls._cache[domain] = {
+                'data': result.copy(),
+                'timestamp': time.time()
+            }
+            cls._cache.move_to_end(domain)
+            while len(cls._cache) > cls._cache_maxsize:
+                evicted, _ = cls._cache.popitem(last=False)
+                logger.debug(f"♻️ Éviction LRU du cache DNS: {evicted}")
+
     @classmethod
     def clear_cache(cls) -> None:
         """Vider le cache (utile pour les tests)"""
-        cls._cache.clear()
+        with cls._cache_lock:
+            cls._cache.clear()
         logger.info("🗑️ Cache DNS vidé")
-    
+
     @classmethod
     def get_cache_stats(cls) -> Dict[str, int]:
         """Obtenir les stats du cache"""
-        total = len(cls._cache)
-        expired = 0
         current_time = time.time()
-        
-        for entry in cls._cache.values():
-            age = current_time - entry.get('timestamp', 0)
-            if age >= cls._cache_ttl:
-                expired += 1
-        
+        with cls._cache_lock:
+            total = len(cls._cache)
+            expired = sum(
+                1 for entry in cls._cache.values()
+                if current_time - entry.get('timestamp', 0) >= cls._cache_ttl
+            )
+
         return {
             'total_entries': total,
             'expired_entries': expired,
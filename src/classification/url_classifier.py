@@ -28,6 +28,30 @@ class URLClassifier:
     def __init__(self):
         self.dns_checker = DNSChecker()
 
+    def prewarm_dns_cache(self, ads: List[Dict[str, Any]]) -> None:
+        """
+        Pré-résoudre en parallèle les domaines d'un lot de publicités
+
+        Seul le premier domaine non ignoré de chaque publicité est
+        collecté (classify_ad s'arrête au premier), puis le lot part en
+        une passe check_domains_bulk: la boucle de classification ne
+        fait ensuite que des hits cache, et le coût DNS d'une page tombe
+        du cumul des latences à leur maximum.
+
+        Args:
+            ads: Publicités à classifier ensuite via classify_ad
+        """
+        domains = []
+        for ad in ads:
+            for url in self._extract_urls_from_ad(ad):
+                domain = self._extract_domain(url)
+                if domain and not self._is_ignored_domain(domain):
+                    domains.append(domain)
+                    break
+
+        if domains:
+            self.dns_checker.check_domains_bulk(domains)
+
     def classify_ad(
         self, 
         ad: Dict[str, Any], 
@@ -2,12 +2,13 @@
 Client MongoDB unifié pour toutes les opérations
 Gère: stores, ads_metrics (Phase 1 mapping + Phase 2 analysis)
 """
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from functools import lru_cache
 from bson import ObjectId
-import os
+from config.settings import settings
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -23,10 +24,7 @@ class MongoDBClient:
         Args:
             connection_string: URI MongoDB (défaut: 127.0.0.1:27017)
         """
-        self.connection_string = connection_string or os.getenv(
-            'MONGODB_URI', 
-            'mongodb://127.0.0.1:27017/?directConnection=true'
-        )
+        self.connection_string = connection_string or settings.MONGODB_URI
         self.client = None
         self.db = None
         self._connect()
@@ -34,7 +32,15 @@ class MongoDBClient:
     def _connect(self):
         """Établir la connexion à MongoDB"""
         try:
-            self.client = MongoClient(self.connection_string)
+            # Pool partagé du processus (voir get_mongo_client):
+            # sélection serveur bornée à 2s et compression du fil
+            # (zstd/snappy si dispo) sur les documents d'ads volumineux
+            self.client = MongoClient(
+                self.connection_string,
+                maxPoolSize=50,
+                serverSelectionTimeoutMS=2000,
+                compressors='zstd,snappy,zlib'
+            )
             # Test de connexion
             self.client.admin.command('ping')
             
@@ -82,6 +88,36 @@ class MongoDBClient:
                 [('type', ASCENDING), ('timestamp', DESCENDING)],
                 name='idx_type_timestamp'
             )
+
+            # Index composites pour les requêtes Phase 2
+            # (find {status, type} + sort timestamp desc → IXSCAN sans
+            # tri en mémoire)
+            collection.create_index(
+                [('status', ASCENDING), ('type', ASCENDING),
+                 ('timestamp', DESCENDING)],
+                name='idx_status_type_timestamp',
+                background=True
+            )
+            # Index pour les tris sur created_at (check_mongodb.py,
+            # SiteMapper.save_mapping): limit-10 en parcours d'index
+            # borné au lieu d'un tri en mémoire O(N log N)
+            collection.create_index(
+                [('created_at', DESCENDING)],
+                name='idx_created_desc',
+                background=True
+            )
+            collection.create_index(
+                [('type', ASCENDING), ('created_at', DESCENDING)],
+                name='idx_type_created',
+                background=True
+            )
+
+            collection.create_index(
+                [('client_id', ASCENDING), ('type', ASCENDING),
+                 ('timestamp', DESCENDING)],
+                name='idx_client_type_timestamp',
+                background=True
+            )
             
             logger.info("✅ Indexes MongoDB créés/vérifiés")
         except Exception as e:
@@ -91,102 +127,152 @@ class MongoDBClient:
     # PHASE 1: DISCOVERY & MAPPING
     # ========================================================================
     
+    def build_mapping_document(self, mapping: Dict,
+                               processing_metadata: Dict = None) -> Dict:
+        """
+        Construire le document ads_metrics d'un mapping Phase 1
+
+        Args:
+            mapping: Résultat du mapping (format SiteMapper)
+            processing_metadata: Métadonnées du traitement
+
+        Returns:
+            Document prêt à être upserté
+        """
+        client_id = mapping['client_id']
+
+        # Calculer le total d'ads pour déterminer le statut
+        total_ads = sum(m['total_ads'] for m in mapping.get('mappings', []))
+        is_active = mapping.get('is_active', total_ads >= 5)
+
+        # Préparer le document
+        document = {
+            'client_id': client_id,
+            'type': 'mapping',  # Type Phase 1
+            'timestamp': datetime.now(),
+            'processing_status': 'completed',
+
+            # 🎯 STATUT ACTIVITÉ (simplifié)
+            'status': 'active' if is_active else 'inactive',
+            'is_active': is_active,
+            'phase2_recommendation': 'PROCESS' if is_active else 'SKIP',
+
+            # Statistiques globales
+            'stats': {
+                'total_sites': len(mapping.get('mappings', [])),
+                'total_ads': total_ads,
+                'total_fb_pages': sum(len(m['fb_pages']) for m in mapping.get('mappings', [])),
+                'sites_with_ads': sum(1 for m in mapping.get('mappings', []) if m['total_ads'] > 0),
+                'sites_with_pages': sum(1 for m in mapping.get('mappings', []) if m['fb_pages'])
+            },
+
+            # Détails par site
+            'sites_mapping': [],
+
+            # Métadonnées de traitement
+            'processing_metadata': processing_metadata or {}
+        }
+
+        # Transformer les mappings
+        for site_mapping in mapping.get('mappings', []):
+            site_data = {
+                'site': site_mapping['site'],
+                'total_ads': site_mapping['total_ads'],
+                'discovery_timestamp': site_mapping.get('timestamp'),
+
+                # Pages Facebook
+                'fb_pages': [
+                    {
+                        'page_id': page['page_id'],
+                        'page_name': page['page_name'],
+                        'page_url': page['page_url'],
+                        'ads_count': page['ads_count'],
+                        'confidence': page['confidence'],
+                        'sample_ads': page.get('sample_ads', [])
+                    }
+                    for page in site_mapping.get('fb_pages', [])
+                ],
+
+                # Métadonnées
+                'metadata': {
+                    'has_ads': site_mapping['total_ads'] > 0,
+                    'has_fb_pages': len(site_mapping.get('fb_pages', [])) > 0,
+                    'best_match_confidence': max(
+                        [p['confidence'] for p in site_mapping.get('fb_pages', [])],
+                        default=0
+                    )
+                }
+            }
+
+            document['sites_mapping'].append(site_data)
+
+        return document
+
     def save_mapping(self, mapping: Dict, processing_metadata: Dict = None) -> bool:
         """
         Sauvegarder un mapping de Phase 1 dans ads_metrics
-        
+
         Args:
             mapping: Résultat du mapping (format SiteMapper)
             processing_metadata: Métadonnées du traitement
-        
+
         Returns:
             True si succès, False sinon
         """
         try:
-            client_id = mapping['client_id']
-            
-            # Calculer le total d'ads pour déterminer le statut
-            total_ads = sum(m['total_ads'] for m in mapping.get('mappings', []))
-            is_active = mapping.get('is_active', total_ads >= 5)
-            
-            # Préparer le document
-            document = {
-                'client_id': client_id,
-                'type': 'mapping',  # Type Phase 1
-                'timestamp': datetime.now(),
-                'processing_status': 'completed',
-                
-                # 🎯 STATUT ACTIVITÉ (simplifié)
-                'status': 'active' if is_active else 'inactive',
-                'is_active': is_active,
-                'phase2_recommendation': 'PROCESS' if is_active else 'SKIP',
-                
-                # Statistiques globales
-                'stats': {
-                    'total_sites': len(mapping.get('mappings', [])),
-                    'total_ads': total_ads,
-                    'total_fb_pages': sum(len(m['fb_pages']) for m in mapping.get('mappings', [])),
-                    'sites_with_ads': sum(1 for m in mapping.get('mappings', []) if m['total_ads'] > 0),
-                    'sites_with_pages': sum(1 for m in mapping.get('mappings', []) if m['fb_pages'])
-                },
-                
-                # Détails par site
-                'sites_mapping': [],
-                
-                # Métadonnées de traitement
-                'processing_metadata': processing_metadata or {}
-            }
-            
-            # Transformer les mappings
-            for site_mapping in mapping.get('mappings', []):
-                site_data = {
-                    'site': site_mapping['site'],
-                    'total_ads': site_mapping['total_ads'],
-                    'discovery_timestamp': site_mapping.get('timestamp'),
-                    
-                    # Pages Facebook
-                    'fb_pages': [
-                        {
-                            'page_id': page['page_id'],
-                            'page_name': page['page_name'],
-                            'page_url': page['page_url'],
-                            'ads_count': page['ads_count'],
-                            'confidence': page['confidence'],
-                            'sample_ads': page.get('sample_ads', [])
-                        }
-                        for page in site_mapping.get('fb_pages', [])
-                    ],
-                    
-                    # Métadonnées
-                    'metadata': {
-                        'has_ads': site_mapping['total_ads'] > 0,
-                        'has_fb_pages': len(site_mapping.get('fb_pages', [])) > 0,
-                        'best_match_confidence': max(
-                            [p['confidence'] for p in site_mapping.get('fb_pages', [])],
-                            default=0
-                        )
-                    }
-                }
-                
-                document['sites_mapping'].append(site_data)
-            
+            document = self.build_mapping_document(mapping, processing_metadata)
+            client_id = document['client_id']
+
             # Upsert (mise à jour ou insertion)
             result = self.db.ads_metrics.update_one(
                 {'client_id': client_id, 'type': 'mapping'},
                 {'$set': document},
                 upsert=True
             )
-            
+
             if result.upserted_id:
                 logger.info(f"✅ Nouveau mapping créé pour {client_id}")
             else:
                 logger.info(f"✅ Mapping mis à jour pour {client_id}")
-            
+
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde mapping pour {mapping.get('client_id')}: {e}")
             return False
+
+    def bulk_save_mappings(self, documents: List[Dict]) -> bool:
+        """
+        Upserter plusieurs mappings en UN seul bulk_write non ordonné
+
+        Un batch de 30 documents coûte 1 aller-retour au lieu de 30.
+
+        Args:
+            documents: Documents construits par build_mapping_document
+
+        Returns:
+            True si succès, False sinon
+        """
+        if not documents:
+            return True
+
+        try:
+            ops = [
+                UpdateOne(
+                    {'client_id': doc['client_id'], 'type': 'mapping'},
+                    {'$set': doc},
+                    upsert=True
+                )
+                for doc in documents
+            ]
+            result = self.db.ads_metrics.bulk_write(ops, ordered=False)
+            logger.info(f"✅ Bulk mappings: {result.upserted_count} créés, "
+                        f"{result.modified_count} mis à jour")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erreur bulk_write mappings: {e}")
+            return False
     
     def mark_mapping_as_failed(self, client_id: str, error: str, 
                                processing_metadata: Dict = None) -> bool:
@@ -246,6 +332,33 @@ class MongoDBClient:
         except Exception as e:
             logger.error(f"❌ Erreur vérification mapping pour {client_id}: {e}")
             return False
+
+    def get_completed_client_ids(self, client_ids: List[str]) -> set:
+        """
+        Vérifier en UNE requête quels clients ont un mapping complété
+
+        Remplace N aller-retours is_mapping_completed par un seul find
+        indexé ($in sur client_id) dont on fait un set membership O(1).
+
+        Args:
+            client_ids: IDs des clients à vérifier
+
+        Returns:
+            Ensemble des client_ids déjà complétés
+        """
+        try:
+            cursor = self.db.ads_metrics.find(
+                {
+                    'client_id': {'$in': client_ids},
+                    'type': 'mapping',
+                    'processing_status': 'completed'
+                },
+                {'client_id': 1, '_id': 0}
+            )
+            return {doc['client_id'] for doc in cursor}
+        except Exception as e:
+            logger.error(f"❌ Erreur vérification bulk des mappings: {e}")
+            return set()
     
     # ========================================================================
     # PHASE 2: ANALYSIS & REPORTING
@@ -488,4 +601,17 @@ class MongoDBClient:
         """Fermer la connexion MongoDB"""
         if self.client:
             self.client.close()
-            logger.info("🔌 Connexion MongoDB fermée")
\ No newline at end of file
+            logger.info("🔌 Connexion MongoDB fermée")
+
+
+@lru_cache(maxsize=1)
+def get_mongo_client() -> MongoDBClient:
+    """
+    Client MongoDB singleton du processus
+
+    Chaque construction de MongoDBClient repaie handshake, découverte du
+    serveur et création des index; MongoClient est thread-safe avec son
+    pool interne, un seul client par processus suffit (y compris sous le
+    ThreadPoolExecutor de la Phase 1).
+    """
+    return MongoDBClient()
\ No newline at end of file
@@ -141,7 +141,7 @@ class SiteMapper:
         """
         Sauvegarder le mapping dans MongoDB
         """
-        from src.database.mongo_client import MongoDBClient
+        from src.database.mongo_client import get_mongo_client
         
         client_id = mapping['client_id']
         timestamp = datetime.now()
@@ -151,8 +151,8 @@ class SiteMapper:
         # Marquer le type de document (Phase 1 = mapping)
         mapping['type'] = 'mapping'
         
-        # Sauvegarder dans MongoDB
-        mongo_client = MongoDBClient()
+        # Sauvegarder dans MongoDB (client singleton du processus)
+        mongo_client = get_mongo_client()
         result = mongo_client.db.ads_metrics.insert_one(mapping)
         
         logger.info(f"💾 Mapping sauvegardé dans MongoDB (id: {result.inserted_id})")
@@ -2,6 +2,7 @@
 Tracker de coûts Apify RÉELS via l'API Apify
 """
 import json
+import os
 import requests
 from pathlib import Path
 from datetime import datetime
@@ -10,6 +11,13 @@ from apify_client import ApifyClient
 from src.utils.logger import setup_logger
 from config.settings import settings
 
+# orjson (encodage C) avec repli stdlib, même convention que SimpleCache
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = setup_logger(__name__)
 
 
@@ -22,6 +30,22 @@ class CostTracker:
         self.tracking_file = Path(tracking_file)
         self.tracking_file.parent.mkdir(parents=True, exist_ok=True)
         self.data = self._load_tracking()
+
+        # Journal append-only des batches + résumé compact: permet aux
+        # scripts de consultation de lire O(1) octets (résumé + queue du
+        # jsonl) au lieu de re-parser tout l'historique
+        self.batch_log_file = self.tracking_file.with_suffix('.jsonl')
+        self.summary_file = self.tracking_file.with_name('cost_tracking_summary.json')
+
+        # Totaux incrémentaux du run: cumulés batch par batch, lus tels
+        # quels par le résumé final (pas de re-somme de tous les batches)
+        self.totals = {
+            'successful': 0,
+            'failed': 0,
+            'skipped': 0,
+            'total_clients': 0,
+            'batches': 0
+        }
         
         # Initialiser le client Apify officiel
         self.apify_token = settings.APIFY_API_TOKEN
@@ -65,13 +89,29 @@ class CostTracker:
             'warnings': []
         }
     
+    @staticmethod
+    def _atomic_write_json(path: Path, payload: dict):
+        """
+        Écrire un JSON de façon atomique (fichier temporaire + os.replace)
+
+        Un crash en pleine écriture ne peut pas laisser un fichier
+        tronqué; orjson encode en C si disponible.
+        """
+        tmp_path = str(path) + '.tmp'
+        if HAS_ORJSON:
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
     def _save_tracking(self):
         """Sauvegarder le tracking"""
         self.data['last_update'] = datetime.now().isoformat()
-        
+
         try:
-            with open(self.tracking_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            self._atomic_write_json(self.tracking_file, self.data)
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde coûts: {e}")
     
@@ -188,21 +228,52 @@ class CostTracker:
         }
         self._save_tracking()
     
+    def _append_batch_log(self, batch_record: dict):
+        """Ajouter l'événement de batch au journal append-only (jsonl)"""
+        try:
+            if HAS_ORJSON:
+                with open(self.batch_log_file, 'ab') as f:
+                    f.write(orjson.dumps(batch_record,
+                                         option=orjson.OPT_APPEND_NEWLINE))
+            else:
+                with open(self.batch_log_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(batch_record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture journal des batches: {e}")
+
+    def _save_summary(self, session_cost: float):
+        """Écrire le résumé compact (quelques centaines d'octets)"""
+        try:
+            summary = {
+                'session_cost': session_cost,
+                'budget_limit': self.budget_limit,
+                'clients_count': len(self.data['clients']),
+                'batches_count': len(self.data['batches']),
+                'start_time': self.data.get('start_time'),
+                'last_update': datetime.now().isoformat()
+            }
+            self._atomic_write_json(self.summary_file, summary)
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture résumé des coûts: {e}")
+
     def end_batch(self, batch_number: int, clients_count: int):
         """Enregistrer la fin d'un batch avec le coût réel"""
         batch_cost = self.get_batch_cost()
         session_cost = self.get_session_cost()
-        
-        self.data['batches'].append({
+
+        batch_record = {
             'batch_number': batch_number,
             'cost': batch_cost,
             'session_total': session_cost,
             'clients_count': clients_count,
             'avg_cost_per_client': batch_cost / clients_count if clients_count > 0 else 0,
             'timestamp': datetime.now().isoformat()
-        })
-        
+        }
+        self.data['batches'].append(batch_record)
+        self._append_batch_log(batch_record)
+
         self.data['session_cost'] = session_cost
+        self._save_summary(session_cost)
         
         # Vérifier le budget
         if self.is_budget_warning():
@@ -219,6 +290,19 @@ class CostTracker:
         # Préparer le prochain batch
         self.start_batch()
     
+    def record_batch_totals(self, batch_results: dict):
+        """
+        Cumuler les compteurs d'un batch dans les totaux du run
+
+        Args:
+            batch_results: Résultats du batch (format process_batch)
+        """
+        self.totals['successful'] += batch_results.get('successful', 0)
+        self.totals['failed'] += batch_results.get('failed', 0)
+        self.totals['skipped'] += batch_results.get('skipped', 0)
+        self.totals['total_clients'] += batch_results.get('total_clients', 0)
+        self.totals['batches'] += 1
+
     def is_budget_exceeded(self) -> bool:
         """Vérifier si le budget est dépassé"""
         return self.get_session_cost() >= self.budget_limit
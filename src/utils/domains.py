@@ -0,0 +1,28 @@
+"""
+Normalisation de domaines partagée entre les phases
+"""
+import re
+from functools import lru_cache
+
+# Schéma http(s) en tête + slashs finaux, supprimés en une passe C
+_CLEAN_DOMAIN = re.compile(r'^https?://|/+$')
+
+
+@lru_cache(maxsize=100_000)
+def normalize_domain(raw: str) -> str:
+    """
+    Nettoyer un domaine brut (schéma, espaces, slashs finaux)
+
+    Mémoïsé: les mêmes domaines ({slug}.converty.shop, sites des
+    mappings relus par la Phase 2) reviennent d'un run à l'autre — un
+    hit est un simple lookup de dict, thread-safe.
+
+    Args:
+        raw: Domaine ou URL brut(e)
+
+    Returns:
+        Hôte nettoyé, ou '' si vide
+    """
+    if not raw:
+        return ''
+    return _CLEAN_DOMAIN.sub('', raw.strip())
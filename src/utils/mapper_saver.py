@@ -2,7 +2,7 @@
 Sauvegarde des mappings dans MongoDB via MongoDBClient unifié
 """
 from typing import Dict
-from src.database.mongo_client import MongoDBClient
+from src.database.mongo_client import get_mongo_client
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -15,7 +15,7 @@ class MongoMapperSaver:
     """
     
     def __init__(self):
-        self.mongo_client = MongoDBClient()
+        self.mongo_client = get_mongo_client()
         logger.info("✓ MongoMapperSaver initialisé")
     
     def save_mapping(self, mapping: Dict, processing_metadata: Dict = None) -> bool:
@@ -30,6 +30,28 @@ class MongoMapperSaver:
             True si succès, False sinon
         """
         return self.mongo_client.save_mapping(mapping, processing_metadata)
+
+    def build_mapping_document(self, mapping: Dict,
+                               processing_metadata: Dict = None) -> Dict:
+        """
+        Construire le document d'un mapping sans l'écrire
+
+        Permet de bufferiser les documents d'un batch puis de les écrire
+        en un seul bulk_write.
+        """
+        return self.mongo_client.build_mapping_document(mapping, processing_metadata)
+
+    def bulk_save_mappings(self, documents: list) -> bool:
+        """
+        Écrire plusieurs mappings en un seul bulk_write
+
+        Args:
+            documents: Documents construits par build_mapping_document
+
+        Returns:
+            True si succès, False sinon
+        """
+        return self.mongo_client.bulk_save_mappings(documents)
     
     def mark_as_failed(self, client_id: str, error: str, 
                       processing_metadata: Dict = None) -> bool:
@@ -89,4 +111,16 @@ class MongoMapperSaver:
         Returns:
             True si déjà traité avec succès
         """
-        return self.mongo_client.is_mapping_completed(client_id)
\ No newline at end of file
+        return self.mongo_client.is_mapping_completed(client_id)
+
+    def get_already_processed(self, client_ids: list) -> set:
+        """
+        Vérifier en une seule requête quels clients sont déjà traités
+
+        Args:
+            client_ids: IDs des clients d'un batch
+
+        Returns:
+            Ensemble des client_ids déjà traités avec succès
+        """
+        return self.mongo_client.get_completed_client_ids(client_ids)
\ No newline at end of file
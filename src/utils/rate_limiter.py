@@ -0,0 +1,47 @@
+"""
+Limiteur de débit token bucket pour les appels Apify
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket partagé entre threads
+
+    Remplace une pause fixe entre batches: les jetons se régénèrent au
+    fil du temps réel, donc aucune attente inutile quand le traitement a
+    déjà consommé le délai, et un vrai plafonnement quand les appels
+    partent trop vite (pool de threads compris).
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float = None):
+        """
+        Args:
+            rate_per_sec: Jetons régénérés par seconde (QPS autorisé)
+            capacity: Taille du seau (défaut: rate_per_sec, pas de burst)
+        """
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity if capacity is not None else rate_per_sec)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Bloquer jusqu'à ce que `tokens` jetons soient disponibles"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) * self.rate
+                )
+                self.last_refill = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
@@ -3,11 +3,20 @@ Cache simple pour éviter de re-scraper les mêmes domaines
 """
 import json
 import hashlib
+import os
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 from src.utils.logger import setup_logger
 
+# orjson est ~3-5x plus rapide que json sur les gros fichiers d'ads;
+# repli sur la stdlib si non installé
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = setup_logger(__name__)
 
 
@@ -42,9 +51,12 @@ class SimpleCache:
             return None
         
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
-            
+            if HAS_ORJSON:
+                cached_data = orjson.loads(cache_file.read_bytes())
+            else:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cached_data = json.load(f)
+
             # Vérifier l'expiration
             cached_at = datetime.fromisoformat(cached_data['cached_at'])
             age = datetime.now() - cached_at
@@ -73,37 +85,55 @@ class SimpleCache:
             'ads': ads
         }
         
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+        if HAS_ORJSON:
+            cache_file.write_bytes(orjson.dumps(cache_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, indent=2, ensure_ascii=False)
         
         logger.info(f"💾 Cache SAVE pour {domain} ({len(ads)} ads)")
     
+    def _iter_cache_entries(self):
+        """
+        Énumérer les fichiers de cache en un seul passage os.scandir
+
+        scandir réutilise les infos du dirent (pas de stat() supplémentaire
+        par fichier), contrairement à glob qui re-state chaque entrée.
+        """
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.json') and entry.is_file(follow_symlinks=False):
+                    yield entry
+
     def clear_expired(self) -> int:
         """Nettoyer les caches expirés"""
         cleaned = 0
-        for cache_file in self.cache_dir.glob("*.json"):
+        for entry in self._iter_cache_entries():
             try:
-                with open(cache_file, 'r') as f:
+                with open(entry.path, 'r') as f:
                     data = json.load(f)
-                
+
                 cached_at = datetime.fromisoformat(data['cached_at'])
                 if datetime.now() - cached_at > self.ttl:
-                    cache_file.unlink()
+                    os.unlink(entry.path)
                     cleaned += 1
             except:
                 pass
-        
+
         if cleaned > 0:
             logger.info(f"🧹 {cleaned} caches expirés nettoyés")
         return cleaned
-    
+
     def get_stats(self) -> Dict:
         """Statistiques du cache"""
-        cache_files = list(self.cache_dir.glob("*.json"))
-        total_size = sum(f.stat().st_size for f in cache_files)
-        
+        total_entries = 0
+        total_size = 0
+        for entry in self._iter_cache_entries():
+            total_entries += 1
+            total_size += entry.stat(follow_symlinks=False).st_size
+
         return {
-            'total_entries': len(cache_files),
+            'total_entries': total_entries,
             'total_size_mb': total_size / (1024 * 1024),
             'cache_dir': str(self.cache_dir)
         }